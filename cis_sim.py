@@ -0,0 +1,273 @@
+import re
+import zlib
+import time
+import random
+import secrets
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit, parse_qs
+
+# ── Lokaler CIS-Simulator ─────────────────────────────
+# Bildet die Teile des CIS nach, die der Bot benutzt: Login (POST mit pid),
+# Leistungsübersicht (HTML mit Notentabelle, Transcript-Links, ETag) und das
+# Transcript-PDF. Fehler werden per Fahrplan eingespielt (siehe parse_faults).
+# Genutzt von soak.py; der Bot wird über NAKBOT_CIS_BASE hierher umgeleitet.
+
+OVERVIEW_PATH = "/mein-profil/mein-postfach/leistungsuebersicht"
+NS = "tx_nagrades_nagradesmodules"
+
+FAULT_KINDS = {
+    "slow":     "Antworten um <param> Sekunden verzögern (Standard 5)",
+    "5xx":      "mit Wahrscheinlichkeit <param> (Standard 1) 503 liefern",
+    "drop":     "mit Wahrscheinlichkeit <param> Verbindung ohne Antwort schließen",
+    "expire":   "alle Sessions ungültig – Login-Seite statt Inhalt",
+    "truncate": "PDFs nach <param> Anteil (Standard 0.5) abschneiden",
+    "layout":   "neue cHash-Werte (alte Links → 404) und geänderte Tabellenspalten",
+    "pid":      "neue Login-pid (alte wird abgelehnt)",
+}
+
+
+# ── PDF ───────────────────────────────────────────────
+def _pdf_escape(text):
+    return text.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+def make_pdf(lines):
+    """Minimales einseitiges PDF (Helvetica, eine Zeile pro Eintrag)."""
+    content = "BT /F1 10 Tf 50 800 Td 14 TL\n"
+    content += "".join(f"({_pdf_escape(line)}) Tj T*\n" for line in lines) + "ET"
+    stream = zlib.compress(content.encode("latin-1", "replace"))
+    objs = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        b"<< /Type /Pages /Kids [3 0 R] /Count 1 >>",
+        b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 595 842] "
+        b"/Resources << /Font << /F1 5 0 R >> >> /Contents 4 0 R >>",
+        b"<< /Length %d /Filter /FlateDecode >>\nstream\n" % len(stream) + stream + b"\nendstream",
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica /Encoding /WinAnsiEncoding >>",
+    ]
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for i, obj in enumerate(objs, 1):
+        offsets.append(len(out))
+        out += b"%d 0 obj\n" % i + obj + b"\nendobj\n"
+    xref = len(out)
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objs) + 1)
+    for off in offsets:
+        out += b"%010d 00000 n \n" % off
+    out += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objs) + 1, xref)
+    return bytes(out)
+
+
+# ── Fehler-Fahrplan ───────────────────────────────────
+class Fault:
+    def __init__(self, kind, start_s, duration_s=0.0, param=None):
+        if kind not in FAULT_KINDS:
+            raise ValueError(f"unbekannter Fehler '{kind}' (bekannt: {', '.join(FAULT_KINDS)})")
+        self.kind = kind
+        self.start_s = start_s
+        self.duration_s = duration_s
+        self.param = param
+        self.fired = False
+
+    def active(self, t):
+        return self.start_s <= t < self.start_s + self.duration_s
+
+    def __repr__(self):
+        return f"{self.kind}@{self.start_s:g}+{self.duration_s:g}" + (f":{self.param:g}" if self.param is not None else "")
+
+def parse_faults(spec):
+    """
+    'slow@60+30:2,5xx@120+20:0.5,expire@300,layout@600' →
+    Art@Start[+Dauer][:Parameter], Zeiten in Sekunden ab Simulatorstart.
+    Einmalige Ereignisse (expire, layout, pid) brauchen keine Dauer.
+    """
+    faults = []
+    for part in (spec or "").split(","):
+        part = part.strip()
+        if not part:
+            continue
+        m = re.fullmatch(r"(\w+)@([\d.]+)(?:\+([\d.]+))?(?::([\d.]+))?", part)
+        if not m:
+            raise ValueError(f"Fehlerangabe '{part}' nicht im Format art@start[+dauer][:param]")
+        kind, start, duration, param = m.groups()
+        faults.append(Fault(kind, float(start), float(duration or 0), float(param) if param else None))
+    return faults
+
+
+# ── Simulator ─────────────────────────────────────────
+class CisSimulator:
+    def __init__(self, grades, password="pw", session_ttl=3600, faults=(), seed=None):
+        self.grades = dict(grades)
+        self.password = password
+        self.session_ttl = session_ttl
+        self.faults = list(faults)
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+        self.started = time.time()
+        self.pid = "706@" + secrets.token_hex(20)
+        self.chash = secrets.token_hex(16)
+        self.layout = 0
+        self.sessions = {}              # token -> (user, expires)
+        self.logins = {}                # user -> Anzahl erfolgreicher Logins
+        self.failed_logins = 0
+        self.requests = []              # (ts, user, kind, status)
+        self.grade_changes = []         # (ts, module, grade)
+        self.server = None
+
+    # ── Steuerung ──
+    def set_grade(self, module, grade):
+        with self.lock:
+            self.grades[module] = grade
+            self.grade_changes.append((time.time(), module, grade))
+
+    def elapsed(self):
+        return time.time() - self.started
+
+    def active_faults(self):
+        """Dauerhafte Fehler, die gerade laufen; einmalige werden hier ausgelöst."""
+        now = self.elapsed()
+        active = []
+        with self.lock:
+            for f in self.faults:
+                if f.kind in ("expire", "layout", "pid"):
+                    if not f.fired and now >= f.start_s:
+                        f.fired = True
+                        self._fire(f)
+                elif f.active(now):
+                    active.append(f)
+        return active
+
+    def _fire(self, fault):
+        if fault.kind == "expire":
+            self.sessions.clear()
+        elif fault.kind == "layout":
+            self.chash = secrets.token_hex(16)
+            self.layout += 1
+        elif fault.kind == "pid":
+            self.pid = "706@" + secrets.token_hex(20)
+
+    def transcript_path(self, curriculum, lang):
+        return (f"{OVERVIEW_PATH}?{NS}%5Baction%5D=transcript&{NS}%5Bcontroller%5D=Notenverwaltung"
+                f"&{NS}%5BcurriculumId%5D={curriculum}&{NS}%5Blang%5D={lang}&cHash={self.chash}")
+
+    # ── Seiten ──
+    def login_page(self):
+        return (f"<html><body><h1>Benutzeranmeldung</h1><form method='post'>"
+                f"<input type='hidden' name='pid' value='{self.pid}'>"
+                f"<input name='user'><input name='pass' type='password'></form></body></html>")
+
+    def overview_page(self):
+        with self.lock:
+            grades = dict(self.grades)
+            layout = self.layout
+        rows = []
+        for module, grade in grades.items():
+            # ab dem ersten Layout-Wechsel steht eine zusätzliche Spalte vor der Note
+            extra = f"<td>{5 + layout}</td>" if layout else ""
+            rows.append(f"<tr><td>{module}</td>{extra}<td>{grade}</td></tr>")
+        links = "".join(f"<a href='{self.transcript_path(161, lang)}'>Transcript ({lang})</a>" for lang in ("de", "en"))
+        return f"<html><body><table>{''.join(rows)}</table>{links}</body></html>"
+
+    def transcript_pdf(self):
+        with self.lock:
+            lines = [f"{module} {grade}" for module, grade in self.grades.items()]
+        return make_pdf(["Leistungsübersicht"] + lines)
+
+    # ── Server ──
+    def start(self, port=0):
+        sim = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, fmt, *args):
+                pass
+
+            def _user(self):
+                m = re.search(r"fe_typo_user=(\w+)", self.headers.get("Cookie", ""))
+                with sim.lock:
+                    entry = sim.sessions.get(m.group(1)) if m else None
+                if entry and entry[1] > time.time():
+                    return entry[0]
+                return None
+
+            def _reply(self, status, body=b"", ctype="text/html; charset=utf-8", headers=None, user=None, kind="?"):
+                with sim.lock:
+                    sim.requests.append((time.time(), user, kind, status))
+                self.send_response(status)
+                for k, v in (headers or {}).items():
+                    self.send_header(k, v)
+                self.send_header("Content-Type", ctype)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def _faults(self, kind):
+                """True, wenn die Anfrage durch einen Fehler schon beantwortet ist."""
+                for f in sim.active_faults():
+                    if f.kind == "slow":
+                        time.sleep(f.param or 5)
+                    elif f.kind == "5xx" and sim.random.random() < (f.param or 1):
+                        self._reply(503, b"Service Unavailable", "text/plain", kind=kind)
+                        return True
+                    elif f.kind == "drop" and sim.random.random() < (f.param or 1):
+                        with sim.lock:
+                            sim.requests.append((time.time(), None, kind, 0))
+                        self.close_connection = True
+                        return True
+                return False
+
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length", "0"))
+                form = parse_qs(self.rfile.read(length).decode("utf-8", "replace"))
+                if self._faults("login"):
+                    return
+                user = form.get("user", [""])[0]
+                ok = form.get("pass", [""])[0] == sim.password and form.get("pid", [""])[0] == sim.pid
+                headers = {}
+                with sim.lock:
+                    if ok:
+                        token = secrets.token_hex(16)
+                        sim.sessions[token] = (user, time.time() + sim.session_ttl)
+                        sim.logins[user] = sim.logins.get(user, 0) + 1
+                        headers["Set-Cookie"] = f"fe_typo_user={token}; Path=/"
+                    else:
+                        sim.failed_logins += 1
+                self._reply(200, sim.login_page().encode() if not ok else b"<html>ok</html>",
+                            headers=headers, user=user or None, kind="login")
+
+            def do_GET(self):
+                url = urlsplit(self.path)
+                query = parse_qs(url.query)
+                kind = "transcript" if query.get(f"{NS}[action]") == ["transcript"] else "overview"
+                if self._faults(kind):
+                    return
+                if url.path != OVERVIEW_PATH:
+                    return self._reply(404, b"not found", "text/plain", kind="other")
+                user = self._user()
+                if user is None:
+                    return self._reply(200, sim.login_page().encode(), kind=kind)
+
+                if kind == "overview":
+                    body = sim.overview_page().encode()
+                    etag = f'"{zlib.crc32(body):08x}"'
+                    if self.headers.get("If-None-Match") == etag:
+                        return self._reply(304, headers={"ETag": etag}, user=user, kind=kind)
+                    return self._reply(200, body, headers={"ETag": etag}, user=user, kind=kind)
+
+                if query.get("cHash") != [sim.chash]:
+                    return self._reply(404, b"<html>Seite nicht gefunden</html>", user=user, kind=kind)
+                pdf = sim.transcript_pdf()
+                for f in sim.active_faults():
+                    if f.kind == "truncate":
+                        pdf = pdf[:int(len(pdf) * (f.param or 0.5))]
+                self._reply(200, pdf, "application/pdf", user=user, kind=kind)
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", port), Handler)
+        self.server.daemon_threads = True
+        threading.Thread(target=self.server.serve_forever, name="cis-sim", daemon=True).start()
+        return f"http://127.0.0.1:{self.server.server_address[1]}"
+
+    def stop(self):
+        if self.server:
+            self.server.shutdown()
+            self.server.server_close()
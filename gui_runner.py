@@ -9,6 +9,9 @@ import datetime
 import os
 import socket
 import tempfile
+import queue
+
+from supervisor import Supervisor
 
 SOURCE = pathlib.Path(__file__).resolve().parent
 MAIN = SOURCE / "nakbot" / "__main__.py"
@@ -16,6 +19,11 @@ MODULES = SOURCE / "modules.txt"
 BUILD = SOURCE / "nakbot.pyz"
 REQS = SOURCE / "requirements.txt"
 GUI = SOURCE / "gui_runner.py"
+# Log-Fenster wächst sonst bei wochenlangem Betrieb unbegrenzt
+MAX_LOG_LINES = 5000
+# Event-Pumpe: alle PUMP_MS ms höchstens PUMP_BATCH Events im Tk-Thread abarbeiten
+PUMP_MS = 50
+PUMP_BATCH = 2000
 
 class BotRunnerApp:
     def __init__(self, root):
@@ -24,8 +32,14 @@ class BotRunnerApp:
         self.root.resizable(False, False)
 
         self.pause_seconds = tk.IntVar(value=2)
+        # Kopie für den Pause-Socket-Thread (Tk-Variablen nur im Tk-Thread lesen)
+        self.pause_value = 2
+        self.pause_seconds.trace_add("write", self.on_pause_changed)
         self.last_pause_update = time.time()
 
+        # Event-Bus: Hintergrund-Threads legen Events ab, nur pump_events() fasst Widgets an
+        self.events = queue.Queue()
+
         self.text = ScrolledText(
             root, state="disabled", width=100, height=30,
             font=("Courier", 9), spacing1=0, spacing2=0, spacing3=0
@@ -66,6 +80,8 @@ class BotRunnerApp:
         self.restart_btn.grid(row=0, column=2, padx=5)
 
         self.process = None
+        self.restart_at = None
+        self.supervisor = Supervisor(lambda msg: self.log(msg, "info"))
         self.last_mtime_main = self.get_mtime(MAIN)
         self.last_mtime_modules = self.get_mtime(MODULES)
         self.last_mtime_gui = self.get_mtime(GUI)
@@ -84,6 +100,13 @@ class BotRunnerApp:
         self.setup_tags()
         self.setup_module_editor()
         self.auto_check_loop()
+        self.root.after(PUMP_MS, self.pump_events)
+
+    def on_pause_changed(self, *_):
+        try:
+            self.pause_value = int(self.pause_seconds.get())
+        except (tk.TclError, ValueError):
+            pass  # Feld gerade leer / ungültig – alten Wert behalten
 
     def update_pause_live(self):
         now = time.time()
@@ -120,7 +143,7 @@ class BotRunnerApp:
                             except Exception:
                                 pass
                             # IMMER aktuellen Sekundenwert senden
-                            val = int(self.pause_seconds.get())
+                            val = self.pause_value
                             conn.sendall(f"{val}\n".encode())
                         except Exception as e:
                             self.log(f"[PauseSocket-Conn-Fehler] {e}", "error")
@@ -130,12 +153,58 @@ class BotRunnerApp:
         threading.Thread(target=serve, daemon=True).start()
 
     def log(self, msg, tag="info"):
+        # aus jedem Thread aufrufbar – geschrieben wird in pump_events()
         timestamp = datetime.datetime.now().strftime("[%Y-%m-%d %H:%M:%S]")
-        entry = f"{timestamp} {msg}\n"
-        self.text.config(state="normal")
-        self.text.insert(tk.END, entry, tag)
-        self.text.yview(tk.END)
-        self.text.config(state="disabled")
+        self.events.put(("text", f"{timestamp} {msg}\n", tag))
+
+    def pump_events(self):
+        """
+        Einziger Ort, an dem Widgets aus Hintergrund-Events aktualisiert werden.
+        Fortschritt, Status und Login werden zusammengefasst (nur der letzte Wert
+        zählt), Logzeilen gesammelt und pro Durchlauf in einem Rutsch eingefügt.
+        """
+        texts = []
+        latest = {}
+        try:
+            for _ in range(PUMP_BATCH):
+                event = self.events.get_nowait()
+                kind = event[0]
+                if kind == "text":
+                    if texts and texts[-1][1] == event[2]:
+                        texts[-1][0].append(event[1])
+                    else:
+                        texts.append(([event[1]], event[2]))
+                else:
+                    latest[kind] = event[1]
+        except queue.Empty:
+            pass
+
+        if "progress" in latest:
+            self.progress.configure(value=latest["progress"])
+        if "status" in latest:
+            self.activity_label.config(text=f"Status: {latest['status']}", fg="blue")
+        if "login" in latest:
+            value = latest["login"]
+            self.login_status_label.config(text=f"Login: {value}", fg="green" if value == "OK" else "red")
+        if "running" in latest:
+            running = latest["running"]
+            self.start_btn.config(state="disabled" if running else "normal")
+            self.stop_btn.config(state="normal" if running else "disabled")
+            self.restart_btn.config(state="normal" if running else "disabled")
+        if texts:
+            self.text.config(state="normal")
+            for chunks, tag in texts:
+                self.text.insert(tk.END, "".join(chunks), tag)
+            self.trim_log()
+            self.text.yview(tk.END)
+            self.text.config(state="disabled")
+
+        self.root.after(PUMP_MS, self.pump_events)
+
+    def trim_log(self):
+        lines = int(self.text.index("end-1c").split(".")[0])
+        if lines > MAX_LOG_LINES:
+            self.text.delete("1.0", f"{lines - MAX_LOG_LINES + 1}.0")
 
     def setup_tags(self):
         self.text.tag_config("stdout", foreground="white")
@@ -143,51 +212,51 @@ class BotRunnerApp:
         self.text.tag_config("success", foreground="green")
         self.text.tag_config("info", foreground="cyan")
 
-    def listen_progress_socket(self):
+    def serve_lines(self, path, handle_line, name):
+        """
+        UNIX-Socket-Server: liest pro Verbindung alle Zeilen bis EOF und reicht
+        jede an handle_line weiter. Großer Backlog, damit Bursts nicht verloren gehen.
+        """
         def listen():
             try:
-                if os.path.exists(self.progress_path):
-                    os.remove(self.progress_path)
+                if os.path.exists(path):
+                    os.remove(path)
                 s = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
-                s.bind(self.progress_path)
-                s.listen(1)
+                s.bind(path)
+                s.listen(64)
                 while True:
                     conn, _ = s.accept()
-                    data = conn.recv(32)
-                    try:
-                        val = int(data.decode().strip())
-                        self.root.after(0, self.progress.configure, {"value": val})
-                    except:
-                        self.root.after(0, self.progress.configure, {"value": 0})
-                    conn.close()
+                    with conn:
+                        conn.settimeout(1.0)
+                        try:
+                            for raw in conn.makefile("rb"):
+                                line = raw.decode(errors="ignore").strip()
+                                if line:
+                                    handle_line(line)
+                        except (socket.timeout, OSError):
+                            pass
             except Exception as e:
-                self.log(f"[Fortschrittsfehler] {e}", "error")
+                self.log(f"[{name}-Fehler] {e}", "error")
 
         threading.Thread(target=listen, daemon=True).start()
 
-    def listen_status_socket(self):
-        def listen():
+    def listen_progress_socket(self):
+        def handle(line):
             try:
-                if os.path.exists(self.status_path):
-                    os.remove(self.status_path)
-                s = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
-                s.bind(self.status_path)
-                s.listen(1)
-                while True:
-                    conn, _ = s.accept()
-                    data = conn.recv(128).decode(errors="ignore").strip()
-                    if data.startswith("LOGIN:"):
-                        value = data.split("LOGIN:", 1)[1].strip()
-                        color = "green" if value == "OK" else "red"
-                        self.root.after(0, self.login_status_label.config, {"text": f"Login: {value}", "fg": color})
-                    elif data.startswith("STATUS:"):
-                        value = data.split("STATUS:", 1)[1].strip()
-                        self.root.after(0, self.activity_label.config, {"text": f"Status: {value}", "fg": "blue"})
-                    conn.close()
-            except Exception as e:
-                self.log(f"[StatusSocket-Fehler] {e}", "error")
+                self.events.put(("progress", int(line)))
+            except ValueError:
+                self.events.put(("progress", 0))
 
-        threading.Thread(target=listen, daemon=True).start()
+        self.serve_lines(self.progress_path, handle, "Fortschritt")
+
+    def listen_status_socket(self):
+        def handle(line):
+            if line.startswith("LOGIN:"):
+                self.events.put(("login", line.split("LOGIN:", 1)[1].strip()))
+            elif line.startswith("STATUS:"):
+                self.events.put(("status", line.split("STATUS:", 1)[1].strip()))
+
+        self.serve_lines(self.status_path, handle, "StatusSocket")
 
     def build(self):
         self.log("🔨 Baue neue .pyz …", "info")
@@ -207,7 +276,7 @@ class BotRunnerApp:
 
         self.log("▶️ Starte Bot …", "info")
 
-        env = os.environ.copy()
+        env = self.supervisor.env()
         env["GUI_PROGRESS"] = self.progress_path
         env["GUI_STATUS"] = self.status_path
         env["PAUSE_SOCKET"] = self.pause_path
@@ -219,29 +288,29 @@ class BotRunnerApp:
             bufsize=1,
             env=env
         )
+        self.supervisor.started()
+        self.restart_at = None
 
         threading.Thread(target=self.print_output, args=(self.process.stdout, "stdout"), daemon=True).start()
         threading.Thread(target=self.print_output, args=(self.process.stderr, "error"), daemon=True).start()
 
-        self.start_btn.config(state="disabled")
-        self.stop_btn.config(state="normal")
-        self.restart_btn.config(state="normal")
+        self.events.put(("running", True))
 
     def stop_bot(self):
+        self.restart_at = None
         if self.process:
             self.log("🛑 Stoppe Bot …", "info")
             self.process.terminate()
             self.process.wait()
             self.process = None
-            self.progress["value"] = 0
+            self.events.put(("progress", 0))
 
-        self.start_btn.config(state="normal")
-        self.stop_btn.config(state="disabled")
-        self.restart_btn.config(state="disabled")
+        self.events.put(("running", False))
 
     def restart_bot(self):
         self.stop_bot()
         self.build()
+        self.supervisor.reset()
         self.start_bot()
 
     def get_mtime(self, path):
@@ -252,16 +321,9 @@ class BotRunnerApp:
 
     def print_output(self, stream, tag):
         for line in iter(stream.readline, b''):
-            text = line.decode(errors="replace")
-            self.root.after(0, self.log_raw, text, tag)
+            self.events.put(("text", line.decode(errors="replace"), tag))
         stream.close()
 
-    def log_raw(self, text, tag="stdout"):
-        self.text.config(state="normal")
-        self.text.insert(tk.END, text, tag)
-        self.text.yview(tk.END)
-        self.text.config(state="disabled")
-
     def setup_module_editor(self):
         self.module_frame = tk.Frame(self.root)
         self.module_frame.pack(pady=(0, 10))
@@ -286,8 +348,21 @@ class BotRunnerApp:
                 time.sleep(3)
 
                 if self.process and self.process.poll() is not None:
-                    self.log(f"💥 Bot abgestürzt (Code {self.process.returncode}) – Neustart …", "error")
+                    code = self.process.returncode
                     self.process = None
+                    delay = self.supervisor.exited(code)
+                    if delay is None:
+                        self.stop_bot()
+                    else:
+                        self.restart_at = time.time() + delay
+                elif self.process and self.supervisor.is_hung():
+                    self.log(f"💥 Kein Heartbeat seit {self.supervisor.heartbeat_age():.0f}s – beende Bot …", "error")
+                    self.process.kill()
+                    self.process.wait()
+                    self.process = None
+                    self.restart_at = time.time() + self.supervisor.exited(None)
+
+                if self.process is None and self.restart_at is not None and time.time() >= self.restart_at:
                     self.start_bot()
 
                 if any([
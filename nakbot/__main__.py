@@ -1,24 +1,20 @@
 # nakbot/__main__.py
-import io, re, time, sys, os, pathlib, logging, requests, urllib3, socket, inspect, errno
+import io, re, time, sys, os, zlib, atexit, signal, pathlib, logging, threading, requests, urllib3, socket, inspect, errno
 from requests.exceptions import ConnectionError, HTTPError, Timeout
-from PyPDF2 import PdfReader
 from plyer import notification
+from nakbot import pdfworker, pdf_backends, memwatch, overview, pipeline, log, api, flightrec, lease, discovery, netwatch
+from nakbot.log import dlog, Lazy
+from nakbot.env import parse_bool as _parse_bool
 
 # ───────────────────────────────────────────────────────────────────────────────
 # DEVLOG: Ultra-Verbose Developer Logging
 # Aktivieren: set DEVLOG = True
 # ───────────────────────────────────────────────────────────────────────────────
 
-def _parse_bool(val: str | None) -> bool:
-    if val is None:
-        return False
-    return val.strip().lower() in {"1", "true", "yes", "on", "y"}
-
 DEVLOG = False
 
-# Logging-Setup
-LOG_LEVEL = logging.DEBUG if DEVLOG else logging.INFO
-logging.basicConfig(level=LOG_LEVEL, format="%(asctime)s | %(message)s")
+# Logging-Setup (Subsystem-Level, Drosselung, JSON: siehe nakbot/log.py)
+log.setup(devlog=DEVLOG)
 urllib3.disable_warnings()
 requests.packages.urllib3.disable_warnings()
 
@@ -26,11 +22,6 @@ PKG_ROOT = pathlib.Path(__file__).resolve().parent           # .../nakbot
 REPO_ROOT = PKG_ROOT.parent                                  # Projekt-Root
 MODULE_NAME = __name__
 
-def dlog(module: str, msg: str):
-    """Developer-Log nur bei DEVLOG. Modulpräfix immer vorn dran."""
-    if DEVLOG:
-        logging.debug(f"[{module}] {msg}")
-
 def _short_repr(x, maxlen: int = 120):
     try:
         s = repr(x)
@@ -41,7 +32,9 @@ def _short_repr(x, maxlen: int = 120):
     return s
 
 # ── Tracing jeder Zeile und Variablenänderungen (nur bei DEVLOG) ───────────────
-_TRACE_FRAMES: dict[int, dict] = {}
+# Pro Frame nur die repr()-Strings der Locals merken, nicht die Objekte selbst –
+# sonst hält der Tracer große Werte (PDF-Puffer, Sessions) am Leben.
+_TRACE_FRAMES: dict[int, dict[str, str]] = {}
 
 def _should_trace_file(filename: str) -> bool:
     # nur unsere Files im Repo (Performance & Signal)
@@ -54,9 +47,12 @@ def _locals_diff(prev: dict, curr: dict) -> tuple[dict, dict, dict]:
     """returns (added, changed, removed)"""
     added = {k: curr[k] for k in curr.keys() - prev.keys()}
     removed = {k: prev[k] for k in prev.keys() - curr.keys()}
-    changed = {k: (prev[k], curr[k]) for k in curr.keys() & prev.keys() if prev[k] is not curr[k] or prev[k] != curr[k]}
+    changed = {k: (prev[k], curr[k]) for k in curr.keys() & prev.keys() if prev[k] != curr[k]}
     return added, changed, removed
 
+def _locals_repr(f_locals: dict) -> dict[str, str]:
+    return {k: _short_repr(v) for k, v in f_locals.items()}
+
 def _trace(frame, event, arg):
     if not DEVLOG:
         return
@@ -74,7 +70,7 @@ def _trace(frame, event, arg):
             if args_info.keywords:
                 args_repr["**kwargs"] = _short_repr(args_info.locals.get(args_info.keywords))
             dlog(mod, f"CALL {frame.f_code.co_name}() @ {pathlib.Path(filename).name}:{frame.f_lineno} ARGS={args_repr}")
-            _TRACE_FRAMES[id(frame)] = dict(args_info.locals)
+            _TRACE_FRAMES[id(frame)] = _locals_repr(args_info.locals)
         except Exception as e:
             dlog(mod, f"CALL {frame.f_code.co_name}() (arg parse error: {e})")
         return _trace
@@ -82,16 +78,16 @@ def _trace(frame, event, arg):
     if event == "line":
         try:
             prev = _TRACE_FRAMES.get(id(frame), {})
-            curr = dict(frame.f_locals)
+            curr = _locals_repr(frame.f_locals)
             add, chg, rem = _locals_diff(prev, curr)
             if add or chg or rem:
                 parts = []
                 if add:
-                    parts.append("ADDED={" + ", ".join(f"{k}={_short_repr(v)}" for k,v in add.items()) + "}")
+                    parts.append("ADDED={" + ", ".join(f"{k}={v}" for k,v in add.items()) + "}")
                 if chg:
-                    parts.append("CHANGED={" + ", ".join(f"{k}: {_short_repr(a)} -> {_short_repr(b)}" for k,(a,b) in chg.items()) + "}")
+                    parts.append("CHANGED={" + ", ".join(f"{k}: {a} -> {b}" for k,(a,b) in chg.items()) + "}")
                 if rem:
-                    parts.append("REMOVED={" + ", ".join(f"{k}={_short_repr(v)}" for k,v in rem.items()) + "}")
+                    parts.append("REMOVED={" + ", ".join(f"{k}={v}" for k,v in rem.items()) + "}")
                 dlog(mod, f"LINE {frame.f_code.co_name}() @ {pathlib.Path(filename).name}:{frame.f_lineno} " + " ".join(parts))
             _TRACE_FRAMES[id(frame)] = curr
         except Exception as e:
@@ -118,7 +114,7 @@ def _trace(frame, event, arg):
 
 if DEVLOG:
     sys.settrace(_trace)
-    dlog(MODULE_NAME, f"DEVLOG enabled. Tracing under {REPO_ROOT}")
+    dlog("trace", "DEVLOG enabled. Tracing under %s", REPO_ROOT)
 
 # ───────────────────────────────────────────────────────────────────────────────
 # Konstanten / URLs / Defaults
@@ -126,21 +122,39 @@ if DEVLOG:
 # Pausen Dauer in **Sekunden**
 DEFAULT_PAUSE = 5
 
-LOGIN_URL = ("https://cis.nordakademie.de/"
+# NAKBOT_CIS_BASE: anderer Server, z. B. der lokale Simulator aus cis_sim.py
+CIS_BASE = os.getenv("NAKBOT_CIS_BASE", "https://cis.nordakademie.de").rstrip("/")
+LOGIN_URL = (f"{CIS_BASE}/"
              "?tx_felogin_login%5Baction%5D=login"
              "&tx_felogin_login%5Bcontroller%5D=Login")
-OVERVIEW_URL = "https://cis.nordakademie.de/mein-profil/mein-postfach/leistungsuebersicht"
-TRANSCRIPT_URL = ("https://cis.nordakademie.de/mein-profil/mein-postfach/leistungsuebersicht"
+OVERVIEW_URL = f"{CIS_BASE}/mein-profil/mein-postfach/leistungsuebersicht"
+TRANSCRIPT_URL = (f"{CIS_BASE}/mein-profil/mein-postfach/leistungsuebersicht"
                   "?tx_nagrades_nagradesmodules%5Baction%5D=transcript"
                   "&tx_nagrades_nagradesmodules%5Bcontroller%5D=Notenverwaltung"
                   "&tx_nagrades_nagradesmodules%5BcurriculumId%5D=161"
                   "&tx_nagrades_nagradesmodules%5Blang%5D=de"
                   "&cHash=8260f27159a08bb9c66a7a4d1dd669b9")
 PID = "706@f6c1611250fb5040d7c1b2438b0c8473daa7431e"
+# TRANSCRIPT_URL und PID sind nur Rückfallwerte – aktuelle Werte ermittelt nakbot/discovery.py
+# Exit-Codes für den Runner (supervisor.py): Neustart-Wunsch / Konfigurationsfehler
+EXIT_RESTART = 75
+EXIT_CONFIG = 78
+HEARTBEAT_INTERVAL = 5
 HEAD = {"User-Agent": "Mozilla/5.0", "Connection": "close"}
 
-COUNTER_FILE = pathlib.Path(sys.argv[0]).resolve().parent / "attempt_counter.txt"
-MODULES_PATH = pathlib.Path(sys.argv[0]).resolve().parent / "modules.txt"
+# Schnellweg über die HTML-Leistungsübersicht; PDF nur bei Änderung
+# bzw. spätestens alle NAKBOT_PDF_EVERY Checks
+HTML_FASTPATH = _parse_bool(os.getenv("NAKBOT_HTML_FASTPATH", "1"))
+_FAST_PATH = overview.FastPath(pdf_every=int(os.getenv("NAKBOT_PDF_EVERY", "50")))
+
+# Zustandsordner (Zähler, modules.txt, Flugschreiber); mehrere Instanzen im selben
+# Ordner unterscheiden sich über NAKBOT_WORKER_ID (eigene Zählerdatei)
+STATE_DIR = pathlib.Path(os.getenv("NAKBOT_HOME") or pathlib.Path(sys.argv[0]).resolve().parent)
+WORKER_ID = re.sub(r"[^\w.-]", "_", os.getenv("NAKBOT_WORKER_ID", ""))
+COUNTER_FILE = STATE_DIR / (f"attempt_counter.{WORKER_ID}.txt" if WORKER_ID else "attempt_counter.txt")
+MODULES_PATH = STATE_DIR / "modules.txt"
+_DISCOVERY = discovery.from_env(STATE_DIR, TRANSCRIPT_URL, PID)
+_NET = netwatch.from_env(CIS_BASE)
 
 # ───────────────────────────────────────────────────────────────────────────────
 # Credentials laden (ENV → ./ .config/nakbot/credentials.toml → ~/.config/...)
@@ -158,7 +172,7 @@ def load_credentials() -> tuple[str, str]:
     p = os.getenv("NAKBOT_PASSWORD")
     if u and p:
         logging.info("Credentials: per ENV gefunden.")
-        dlog(MODULE_NAME, f"ENV USERNAME={_short_repr(u)} PASSWORD=*** (versteckt)")
+        dlog("auth", "ENV USERNAME=%s PASSWORD=*** (versteckt)", Lazy(_short_repr, u))
         return u, p
     logging.info("Credentials: keine ENV-Variablen gesetzt.")
 
@@ -180,7 +194,7 @@ def load_credentials() -> tuple[str, str]:
 
     try:
         raw = cred_path.read_text(encoding="utf-8")
-        dlog(MODULE_NAME, f"Credentials: lese Datei {cred_path}, size={len(raw)}")
+        dlog("auth", "Credentials: lese Datei %s, size=%d", cred_path, len(raw))
         data = tomllib.loads(raw)
     except Exception as e:
         logging.error(f"Credentials-Datei {cred_path} konnte nicht gelesen werden: {e}")
@@ -194,7 +208,7 @@ def load_credentials() -> tuple[str, str]:
         raise RuntimeError(f"Credentials unvollständig in {cred_path}")
 
     logging.info(f"Credentials: erfolgreich geladen aus Datei {cred_path}")
-    dlog(MODULE_NAME, f"FILE USERNAME={_short_repr(u)} PASSWORD=*** (versteckt)")
+    dlog("auth", "FILE USERNAME=%s PASSWORD=*** (versteckt)", Lazy(_short_repr, u))
     return u, p
 
 # ───────────────────────────────────────────────────────────────────────────────
@@ -203,7 +217,7 @@ def load_credentials() -> tuple[str, str]:
 
 def _gui_send(key: str, value: str):
     sock_path = os.environ.get("GUI_STATUS")
-    dlog(MODULE_NAME, f"_gui_send key={key!r} value={value!r} path={sock_path}")
+    dlog("gui", "_gui_send key=%r value=%r path=%s", key, value, sock_path)
     if not sock_path:
         return
     try:
@@ -211,23 +225,57 @@ def _gui_send(key: str, value: str):
             s.connect(sock_path)
             s.sendall(f"{key}:{value}\n".encode())
     except Exception as e:
-        dlog(MODULE_NAME, f"_gui_send error: {e}")
+        dlog("gui", "_gui_send error: %s", e)
+
+_last_gui_progress = 0.0
 
 def _gui_progress(kb: int):
+    """Fortschritt an die GUI; höchstens alle 50 ms (die GUI zeigt ohnehin nur den letzten Wert)."""
+    global _last_gui_progress
     sock_path = os.environ.get("GUI_PROGRESS")
-    dlog(MODULE_NAME, f"_gui_progress kb={kb} path={sock_path}")
     if not sock_path:
         return
+    now = time.monotonic()
+    if kb and now - _last_gui_progress < 0.05:
+        return
+    _last_gui_progress = now
+    dlog("gui", "_gui_progress kb=%d path=%s", kb, sock_path)
     try:
         with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as s:
             s.connect(sock_path)
             s.sendall(f"{kb}\n".encode())
     except Exception as e:
-        dlog(MODULE_NAME, f"_gui_progress error: {e}")
+        dlog("gui", "_gui_progress error: %s", e)
+
+def _gui_offline():
+    _gui_send("STATUS", "Offline – warte auf Netz")
+
+_last_heartbeat = 0.0
+
+def _heartbeat() -> None:
+    """Lebenszeichen für den Runner (Datei aus NAKBOT_HEARTBEAT, max. alle 5s)."""
+    global _last_heartbeat
+    path = os.environ.get("NAKBOT_HEARTBEAT")
+    now = time.time()
+    if not path or now - _last_heartbeat < HEARTBEAT_INTERVAL:
+        return
+    _last_heartbeat = now
+    try:
+        pathlib.Path(path).write_text(f"{now:.0f}\n")
+    except OSError as e:
+        dlog("gui", "_heartbeat error: %s", e)
+
+NOTIFY = _parse_bool(os.getenv("NAKBOT_NOTIFY", "1"))
 
 def toast(title: str, msg: str) -> None:
-    dlog(MODULE_NAME, f"toast title={title!r} msg={msg!r}")
-    notification.notify(title=title, message=msg, timeout=5)
+    dlog("gui", "toast title=%r msg=%r", title, msg)
+    if not NOTIFY:
+        return
+    try:
+        notification.notify(title=title, message=msg, timeout=5)
+    except Exception as e:  # headless / kein Notification-Backend
+        log.once(logging.getLogger("nakbot.gui"), "toast-failed", "Desktop-Benachrichtigung nicht möglich: %s", e,
+                 level=logging.WARNING)
 
 # ───────────────────────────────────────────────────────────────────────────────
 # Dynamische Pause (nicht blockierend, robust)
@@ -252,6 +300,8 @@ def _parse_pause_seconds(raw: str) -> int:
     return max(0, int(round(val)))
 
 
+_PAUSE_LOG = log.get("pause")
+
 def get_dynamic_pause_seconds(current_pause_s: int) -> int:
     """
     Nicht-blockierend den GUI-Wert holen.
@@ -264,10 +314,11 @@ def get_dynamic_pause_seconds(current_pause_s: int) -> int:
     """
     sock_path = os.environ.get("PAUSE_SOCKET")
     if not sock_path:
-        logging.info("PAUSE: PAUSE_SOCKET nicht gesetzt – behalte %ss", current_pause_s)
+        # läuft alle 200 ms im Idle-Loop – nur einmal melden
+        log.once(_PAUSE_LOG, "no-socket", "PAUSE: PAUSE_SOCKET nicht gesetzt – behalte %ss", current_pause_s)
         return current_pause_s
     if not os.path.exists(sock_path):
-        logging.info("PAUSE: Socket existiert nicht (%s) – behalte %ss", sock_path, current_pause_s)
+        log.once(_PAUSE_LOG, f"missing:{sock_path}", "PAUSE: Socket existiert nicht (%s) – behalte %ss", sock_path, current_pause_s)
         return current_pause_s
 
     try:
@@ -286,24 +337,24 @@ def get_dynamic_pause_seconds(current_pause_s: int) -> int:
                 try:
                     s.sendall(b"REQ\n")
                 except Exception as e:
-                    dlog(__name__, f"PAUSE send REQ error: {e}")
+                    dlog("pause", "PAUSE send REQ error: %s", e)
                 try:
                     data = s.recv(64).decode().strip()
                 except socket.timeout:
                     data = ""
 
             if data:
-                dlog(__name__, f"PAUSE raw recv={data!r}")
+                dlog("pause", "PAUSE raw recv=%r", data)
                 try:
                     val = _parse_pause_seconds(data)
                     return val
                 except Exception as e:
-                    logging.warning("PAUSE: Ungültiger Wert %r (%s) – behalte %ss", data, e, current_pause_s)
+                    _PAUSE_LOG.warning("PAUSE: Ungültiger Wert %r (%s) – behalte %ss", data, e, current_pause_s)
             else:
-                dlog(__name__, "PAUSE: keine Daten vom Socket – behalte current")
+                dlog("pause", "PAUSE: keine Daten vom Socket – behalte current")
 
     except Exception as e:
-        logging.info("PAUSE: Socket-Fehler (%s) – behalte %ss", e, current_pause_s)
+        _PAUSE_LOG.info("PAUSE: Socket-Fehler (%s) – behalte %ss", e, current_pause_s)
 
     return current_pause_s
 
@@ -318,6 +369,7 @@ def reactive_sleep(pause_s: int) -> int:
     check_step = 0.2  # alle 200 ms GUI abfragen / Countdown updaten
 
     while True:
+        _heartbeat()
         now = time.time()
         remaining = max(0, int(round(end - now)))  # in Sekunden, integer
 
@@ -346,13 +398,13 @@ def reactive_sleep(pause_s: int) -> int:
 # ───────────────────────────────────────────────────────────────────────────────
 
 def load_modules() -> dict:
-    dlog(MODULE_NAME, f"load_modules from {MODULES_PATH}")
+    dlog("modules", "load_modules from %s", MODULES_PATH)
     try:
         raw = MODULES_PATH.read_text(encoding="utf-8")
         lines = [line.strip() for line in raw.splitlines() if line.strip()]
         patterns = {m: re.compile(rf"{re.escape(m)}\s+([^\s]+)", re.I) for m in lines}
         logging.info(f"{len(patterns)} Modul(e) geladen aus modules.txt")
-        dlog(MODULE_NAME, f"modules={lines}")
+        dlog("modules", "modules=%s", lines)
         return patterns
     except FileNotFoundError:
         logging.error("modules.txt nicht gefunden.")
@@ -367,37 +419,53 @@ def load_modules() -> dict:
 
 def login(sess: requests.Session, username: str, password: str, retries: int = 3, limit_s: int = 20) -> None:
     _gui_send("STATUS", "Logging in…")
-    for attempt in range(1, retries + 1):
+    pid_refreshed = False
+    attempt = 0
+    while attempt < retries:
+        attempt += 1
         try:
             logging.info(f"Logon … (Versuch {attempt})")
             t0 = time.time()
-            dlog(MODULE_NAME, f"POST {LOGIN_URL} data.user={_short_repr(username)} data.pass=*** timeout={limit_s}")
+            dlog("net", "POST %s data.user=%s data.pass=*** timeout=%s", LOGIN_URL, Lazy(_short_repr, username), limit_s)
 
             sess.post(LOGIN_URL, data={
                 "user": username, "pass": password,
-                "logintype": "login", "pid": PID, "referer": OVERVIEW_URL
+                "logintype": "login", "pid": _DISCOVERY.pid, "referer": OVERVIEW_URL
             }, headers=HEAD, verify=False, timeout=limit_s)
 
-            dlog(MODULE_NAME, f"GET {OVERVIEW_URL} verify=False timeout={limit_s}")
+            dlog("net", "GET %s verify=False timeout=%s", OVERVIEW_URL, limit_s)
             resp = sess.get(OVERVIEW_URL, headers=HEAD, verify=False, timeout=limit_s)
             dt = time.time() - t0
-            dlog(MODULE_NAME, f"login roundtrip {dt:.3f}s status={getattr(resp, 'status_code', '?')}")
+            dlog("net", "login roundtrip %.3fs status=%s", dt, getattr(resp, "status_code", "?"))
+            flightrec.event("login", attempt=attempt, status=resp.status_code, ms=round(dt * 1000),
+                            bytes=len(resp.content), login_page="Benutzeranmeldung" in resp.text)
 
             if dt > limit_s:
                 raise Timeout("Login dauerte zu lange")
 
             if "Benutzeranmeldung" in resp.text:
+                # geänderte pid im Login-Formular? Dann einmal mit neuem Wert versuchen
+                if not pid_refreshed and _DISCOVERY.observe_login(overview.Overview(resp.text)):
+                    pid_refreshed = True
+                    attempt -= 1  # zählt nicht als Fehlversuch – auch im letzten Versuch neu probieren
+                    continue
                 toast("Login failed", "Check credentials")
                 _gui_send("LOGIN", "FAIL")
                 raise RuntimeError("bad credentials")
 
             logging.info("Logged in ✓")
+            if _DISCOVERY.needs_refresh():
+                _DISCOVERY.observe(overview.Overview(resp.text), resp.url)
             _gui_send("LOGIN", "OK")
             _gui_send("STATUS", "Idle")
             return
 
         except (Timeout, ConnectionError) as err:
+            if _NET and not _NET.probe():
+                _gui_send("LOGIN", "FAIL")
+                raise RuntimeError("Login failed (offline)") from err
             logging.warning(f"Login-Timeout: {err} – neuer Versuch …")
+            flightrec.event("login_error", attempt=attempt, error=str(err))
             time.sleep(2)
         except RuntimeError as err:
             logging.error(f"Login fehlgeschlagen: {err}")
@@ -413,95 +481,258 @@ def login(sess: requests.Session, username: str, password: str, retries: int = 3
 def load_counter() -> int:
     try:
         val = int(COUNTER_FILE.read_text().strip())
-        dlog(MODULE_NAME, f"load_counter -> {val}")
+        dlog("counter", "load_counter -> %d", val)
         return val
     except (FileNotFoundError, ValueError):
-        dlog(MODULE_NAME, "load_counter -> 0 (new)")
+        dlog("counter", "load_counter -> 0 (new)")
         return 0
 
 def save_counter(value: int) -> None:
-    dlog(MODULE_NAME, f"save_counter {value}")
+    dlog("counter", "save_counter %d", value)
     COUNTER_FILE.write_text(f"{value}\n")
 
 # ───────────────────────────────────────────────────────────────────────────────
 # Download/Parsing
 # ───────────────────────────────────────────────────────────────────────────────
 
-_last_printed_kb = 0
+_PROGRESS_LOCK = threading.Lock()
 
-def _print_progress(done_bytes: int) -> None:
-    global _last_printed_kb
+def _print_progress(done_bytes: int, printed_kb: int) -> int:
+    """Fortschrittsbalken bis done_bytes fortsetzen; gibt den neuen Stand zurück (pro Download)."""
     done_kb = done_bytes // 1024
-    while _last_printed_kb < done_kb:
-        sys.stdout.write("│")
-        _last_printed_kb += 1
-    sys.stdout.flush()
-
-def stream_pdf(sess: requests.Session, retries: int = 3) -> io.BytesIO:
+    if done_kb > printed_kb:
+        with _PROGRESS_LOCK:
+            sys.stdout.write("│" * (done_kb - printed_kb))
+            sys.stdout.flush()
+    return max(printed_kb, done_kb)
+
+def _not_pdf(r: requests.Response, url: str, first: bytes) -> None:
+    """Antwort ist kein PDF: abgelaufene Session (Login-Seite) oder verschobener Link."""
+    body = first + r.raw.read(256 * 1024, decode_content=True)
+    if b"Benutzeranmeldung" in body:
+        raise RuntimeError("Session abgelaufen (Login-Seite statt Transcript)")
+    raise discovery.TranscriptMoved(url, f"kein PDF ({r.headers.get('Content-Type', '?')})")
+
+def stream_pdf(sess: requests.Session, url: str = TRANSCRIPT_URL, retries: int = 3) -> io.BytesIO:
     logging.info("Verbindung zum Transcript wird aufgebaut …")
     _gui_send("STATUS", "Downloading Transcript")
 
     for attempt in range(1, retries + 1):
         try:
             logging.info(f"Download-Versuch {attempt} …")
-            dlog(MODULE_NAME, f"GET {TRANSCRIPT_URL} stream=True")
-            with sess.get(TRANSCRIPT_URL, headers=HEAD, stream=True, timeout=30, verify=False) as r:
+            dlog("net", "GET %s stream=True", url)
+            t0 = time.monotonic()
+            with sess.get(url, headers=HEAD, stream=True, timeout=30, verify=False) as r:
+                flightrec.event("http", what="pdf", url=url, status=r.status_code,
+                                ttfb_ms=round((time.monotonic() - t0) * 1000),
+                                ctype=r.headers.get("Content-Type"))
+                if 400 <= r.status_code < 500 and r.status_code not in (408, 429):
+                    raise discovery.TranscriptMoved(url, f"HTTP {r.status_code}")
                 r.raise_for_status()
 
-                global _last_printed_kb
-                _last_printed_kb = 0
-
                 buf = io.BytesIO()
                 size = 0
+                printed_kb = 0
+                crc = 0
+                head = b""
 
                 for chunk in r.iter_content(1024):
+                    if not size:
+                        head = chunk[:5]
+                        if not chunk.startswith(b"%PDF"):
+                            _not_pdf(r, url, chunk)
                     buf.write(chunk)
                     size += len(chunk)
-                    _print_progress(size)
+                    crc = zlib.crc32(chunk, crc)
+                    printed_kb = _print_progress(size, printed_kb)
                     _gui_progress(size // 1024)
 
                 buf.seek(0)
                 sys.stdout.write("\n")
                 logging.info(f"PDF erfolgreich geladen ({size/1024:.1f} kB) ✓")
                 _gui_progress(0)
-                dlog(MODULE_NAME, f"PDF bytes={size}")
+                dlog("net", "PDF bytes=%d", size)
+                flightrec.event("pdf", bytes=size, crc32=f"{crc:08x}", ms=round((time.monotonic() - t0) * 1000),
+                                magic=head.decode("latin-1"))
                 return buf
 
         except (ConnectionError, HTTPError) as err:
+            if _NET and not _NET.probe():
+                raise RuntimeError("PDF download failed (offline)") from err
             logging.warning(f"Download-Fehler: {err} – nächster Versuch …")
+            flightrec.event("http_error", what="pdf", attempt=attempt, error=str(err))
             _gui_send("STATUS", "Waiting for Server Response")
             time.sleep(2 ** attempt)
 
     raise RuntimeError("PDF download failed")
 
-def pdf_text(buf: io.BytesIO) -> str:
-    dlog(MODULE_NAME, "pdf_text: extracting")
-    return "\n".join(p.extract_text() or "" for p in PdfReader(buf).pages)
-
-def check_modules(sess: requests.Session, patterns: dict) -> None:
-    logging.info("Analysiere PDF …")
-    _gui_send("STATUS", "Parsing PDF")
-
-    buf = stream_pdf(sess)
-    try:
-        text = pdf_text(buf)
-    finally:
-        buf.close()
-
-    for module, pattern in patterns.items():
-        m = pattern.search(text)
-        if not m:
-            logging.info(f"{module}: Zeile fehlt")
+def transcript_targets() -> list[tuple[str, str]]:
+    """(Label, URL) aller zu prüfenden Transcripts; weitere per NAKBOT_EXTRA_TRANSCRIPTS (';'-getrennt)."""
+    targets = _DISCOVERY.targets()
+    extra = [u.strip() for u in os.getenv("NAKBOT_EXTRA_TRANSCRIPTS", "").split(";") if u.strip()]
+    targets += [(f"Transcript {i}", url) for i, url in enumerate(extra, start=2)]
+    return targets
+
+def report_grades(grades: dict[str, str | None], label: str | None = None) -> None:
+    prefix = f"[{label}] " if label else ""
+    for module, grade in grades.items():
+        if grade is None:
+            logging.info(f"{prefix}{module}: Zeile fehlt")
             continue
 
-        grade = m.group(1).strip()
         if grade == "#":
-            logging.info(f"{module}: noch #")
+            logging.info(f"{prefix}{module}: noch #")
         else:
             msg = f"{module}: {grade}"
-            logging.info(msg)
+            logging.info(prefix + msg)
             toast("Grade update", msg)
 
+def pdf_grades(sess: requests.Session, patterns: dict,
+               targets: list[tuple[str, str]] | None = None) -> dict[str, str | None]:
+    """
+    Transcripts über die Pipeline fetch → parse → match → notify verarbeiten.
+    Parallelität je Stufe: NAKBOT_PIPELINE="fetch=2,parse=1,…",
+    Queue-Größe zwischen den Stufen: NAKBOT_PIPELINE_QUEUE.
+    """
+    logging.info("Analysiere PDF …")
+    _gui_send("STATUS", "Parsing PDF")
+    targets = targets or transcript_targets()
+    multi = len(targets) > 1
+    fixtures = os.getenv("NAKBOT_PDF_FIXTURES")
+    record = bool(fixtures) and _parse_bool(os.getenv("NAKBOT_PDF_RECORD"))
+
+    def fetch(job):
+        try:
+            job["buf"] = stream_pdf(sess, job["url"])
+        except discovery.TranscriptMoved as err:
+            job["url"] = rediscover(sess, err)
+            job["buf"] = stream_pdf(sess, job["url"])
+        if record:
+            # Transcript als Fixture für den Backend-Benchmark aufzeichnen
+            pdf_backends.record_fixture(pathlib.Path(fixtures), job["buf"].getvalue())
+        return job
+
+    def parse(job):
+        buf = job.pop("buf")
+        try:
+            # Parsing im vorgewärmten Worker-Prozess (NAKBOT_PDF_WORKERS=0 → inline)
+            with buf.getbuffer() as view:
+                job["grades"] = pdfworker.get_pool().parse(view, patterns)
+        finally:
+            buf.close()
+        return job
+
+    def match(job):
+        # bei mehreren Transcripts nur melden, was in diesem Transcript steht
+        job["report"] = {m: g for m, g in job["grades"].items() if g is not None or not multi}
+        return job
+
+    def notify(job):
+        report_grades(job["report"], job["label"] if multi else None)
+        return job
+
+    width = pipeline.parse_parallelism(os.getenv("NAKBOT_PIPELINE"))
+    qsize = int(os.getenv("NAKBOT_PIPELINE_QUEUE", "2"))
+    stages = [pipeline.Stage(name, fn, width.get(name, 1), qsize)
+              for name, fn in (("fetch", fetch), ("parse", parse), ("match", match), ("notify", notify))]
+    results = pipeline.Pipeline(stages).run({"label": label, "url": url} for label, url in targets)
+
+    failed = [r for r in results if isinstance(r, pipeline.StageFailed)]
+    done = {r["label"]: r["grades"] for r in results if not isinstance(r, pipeline.StageFailed)}
+    for f in failed:
+        logging.warning(f"{f.item['label']}: Stufe {f.stage} fehlgeschlagen ({f.error})")
+    if failed:
+        # auch bei Teilfehlern den ganzen Check scheitern lassen: die Module des fehlenden
+        # Transcripts wären sonst None und landeten im Schnellweg-Cache und in der API-Historie
+        raise failed[0].error
+
+    merged: dict[str, str | None] = {m: None for m in patterns}
+    for label, _ in targets:
+        for module, grade in done.get(label, {}).items():
+            if merged.get(module) is None:
+                merged[module] = grade
+    if multi:
+        report_grades({m: g for m, g in merged.items() if g is None})
+    return merged
+
+_REDISCOVER_LOCK = threading.Lock()
+
+def rediscover(sess: requests.Session, err: discovery.TranscriptMoved, limit_s: int = 20) -> str:
+    """Links nach einem Fehlschlag neu aus der Übersicht lesen; neue URL oder err weiterwerfen."""
+    if not _DISCOVERY.enabled:
+        raise err
+    with _REDISCOVER_LOCK:
+        new_url = _DISCOVERY.replacement(err.url)
+        if _DISCOVERY.invalid or new_url in (None, err.url):
+            _DISCOVERY.invalidate(err)
+            resp = sess.get(OVERVIEW_URL, headers=HEAD, verify=False, timeout=limit_s)
+            resp.raise_for_status()
+            ov = overview.Overview(resp.text)
+            if not ov.logged_in:
+                raise RuntimeError("Session abgelaufen (Login-Seite statt Leistungsübersicht)")
+            _DISCOVERY.observe(ov, resp.url)
+            new_url = _DISCOVERY.replacement(err.url)
+    flightrec.event("rediscover", old=err.url, new=new_url, reason=err.reason)
+    if new_url in (None, err.url):
+        raise err
+    logging.info("Transcript-Link aktualisiert – lade erneut")
+    return new_url
+
+def fetch_overview(sess: requests.Session, limit_s: int = 20) -> overview.Overview:
+    """Leistungsübersicht holen (Conditional GET); Login-Seite ⇒ Session abgelaufen."""
+    _gui_send("STATUS", "Checking Overview")
+    dlog("net", "GET %s (fast path)", OVERVIEW_URL)
+    headers = {**HEAD, **_FAST_PATH.request_headers()}
+    t0 = time.monotonic()
+    resp = sess.get(OVERVIEW_URL, headers=headers, verify=False, timeout=limit_s)
+    flightrec.event("http", what="overview", status=resp.status_code, bytes=len(resp.content),
+                    ms=round((time.monotonic() - t0) * 1000))
+    if resp.status_code != 304:
+        resp.raise_for_status()
+    ov = _FAST_PATH.update(resp.status_code, resp.text, resp.headers)
+    dlog("net", "overview status=%s bytes=%d rows=%d fp=%.12s", resp.status_code, len(resp.content), len(ov.rows), ov.fingerprint)
+    flightrec.event("overview", rows=len(ov.rows), fingerprint=ov.fingerprint[:12], logged_in=ov.logged_in)
+    if ov.logged_in and _DISCOVERY.needs_refresh():
+        _DISCOVERY.observe(ov, OVERVIEW_URL)
+    if not ov.logged_in:
+        raise RuntimeError("Session abgelaufen (Login-Seite statt Leistungsübersicht)")
+    return ov
+
+def _lease_key(username: str, url: str) -> str:
+    """Lease-Schlüssel je Konto und Transcript."""
+    return f"{username}|{url}"
+
+def check_modules(sess: requests.Session, patterns: dict,
+                  targets: list[tuple[str, str]] | None = None,
+                  fresh: overview.Overview | None = None) -> None:
+    """fresh: gerade geholte Übersicht (Session-Prüfung nach Resume) – dann kein zweiter GET."""
+    grades = None
+    source = "pdf"
+    # Schnellweg nur, wenn dieser Worker alle Transcripts des Kontos hält
+    fast = HTML_FASTPATH and (targets is None or len(targets) == len(transcript_targets()))
+    if fast:
+        try:
+            if fresh is None:
+                fetch_overview(sess)
+            grades, source = _FAST_PATH.lookup(patterns)
+        except (ConnectionError, HTTPError, Timeout) as err:
+            source = f"Übersicht nicht abrufbar ({err})"
+        if grades is not None:
+            logging.info(f"Noten aus Leistungsübersicht ({source}) – PDF übersprungen")
+        else:
+            logging.info(f"PDF nötig: {source}")
+        flightrec.event("fastpath", hit=grades is not None, reason=source)
+
+    if grades is None:
+        grades = pdf_grades(sess, patterns, targets)
+        source = "pdf"
+        if fast:
+            _FAST_PATH.pdf_result(grades, patterns)
+    else:
+        report_grades(grades)
+
+    flightrec.event("result", source=source, grades=grades)
+    api.STATE.update(grades, source)
     _gui_send("STATUS", "Idle")
 
 # ───────────────────────────────────────────────────────────────────────────────
@@ -509,6 +740,7 @@ def check_modules(sess: requests.Session, patterns: dict) -> None:
 # ───────────────────────────────────────────────────────────────────────────────
 
 def main():
+    _heartbeat()
     attempts = load_counter()
     reload_interval = 5
     error_count = 0
@@ -517,7 +749,7 @@ def main():
     if not patterns:
         logging.error("Keine gültigen Module geladen – beende Bot.")
         _gui_send("STATUS", "Keine Module")
-        return
+        return EXIT_CONFIG
 
     # Credentials laden
     try:
@@ -525,15 +757,43 @@ def main():
     except Exception as err:
         logging.error(f"Credentials-Fehler: {err}")
         _gui_send("STATUS", "Credentials fehlen/fehlerhaft")
-        return
+        return EXIT_CONFIG
 
     session = requests.Session()
+    # Sharding: nur Transcripts pollen, deren Lease dieser Worker hält (NAKBOT_LEASE_DB)
+    shard = lease.from_env(group=username)
+    if shard:
+        shard.start()
+        atexit.register(shard.release)
+        # SIGTERM vom Runner: atexit laufen lassen, damit andere sofort übernehmen
+        signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(128 + signum))
+
+    # Flugschreiber: Dumps bei Fehler/Absturz/SIGUSR1 (NAKBOT_FLIGHTREC*)
+    flightrec.install(COUNTER_FILE.parent / "flightrec")
+    flightrec.begin("start")
+
+    watchdog = memwatch.from_env()
+    if watchdog:
+        watchdog.register_trim("trace-frames", _TRACE_FRAMES.clear)
+        watchdog.register_trim("pdf-worker", pdfworker.get_pool().recycle)
+        watchdog.start()
+
+    # Lese-API für Dashboards/Skripte (NAKBOT_API_PORT / NAKBOT_API_SOCKET)
+    api.start_from_env()
+
+    # Verbindungswächter: offline nicht pollen, nach Resume sofort prüfen (NAKBOT_NETWATCH)
+    if _NET:
+        _NET.start()
+        _NET.wait_online(_heartbeat, _gui_offline)
 
     try:
         login(session, username, password)
+        flightrec.end()
     except RuntimeError as err:
         logging.error(f"Login fehlgeschlagen: {err}")
-        return
+        flightrec.end(err)
+        flightrec.failure("login")
+        return EXIT_CONFIG if "bad credentials" in str(err) else 1
 
     # Lokale Pause-Variable
     # vor der while-Schleife
@@ -543,12 +803,30 @@ def main():
     logging.info("Start-Pause (Sekunden): %s", pause_s)
 
     while True:
+        _heartbeat()
+        log.reload_levels()
         # hol ggf. neuen GUI-Wert; behalte alten, wenn kein Input
         new_pause_s = get_dynamic_pause_seconds(pause_s)
         if new_pause_s != pause_s:
             logging.info(f"Pausenzeit geändert: {pause_s}s -> {new_pause_s}s")
             pause_s = new_pause_s
 
+        # offline: hier parken statt Login-Retries/Backoff zu durchlaufen
+        reason = _NET.gate(_heartbeat, _gui_offline) if _NET else None
+        fresh = None
+        if reason:
+            # eine gemeinsame Session-Prüfung statt erzwungenem Re-Login, danach sofort checken
+            logging.info(f"{reason} – prüfe Session")
+            error_count = 0
+            try:
+                fresh = fetch_overview(session)  # gilt gleich als Übersicht dieses Checks
+            except RuntimeError:
+                error_count = 1  # Login-Seite → Re-Login unten
+            except (ConnectionError, HTTPError, Timeout) as err:
+                logging.warning(f"Session-Prüfung fehlgeschlagen: {err}")
+                _NET.note_failure()
+                continue
+
         attempts += 1
         save_counter(attempts)
 
@@ -561,6 +839,24 @@ def main():
                 pause_s = reactive_sleep(pause_s)
                 continue
 
+        flightrec.begin(attempts)
+        targets = None
+        if shard:
+            keys = {_lease_key(username, url): (label, url) for label, url in transcript_targets()}
+            try:
+                owned = shard.sync(list(keys))
+            except Exception as err:  # sqlite3.Error, Dateisystem
+                logging.warning(f"Lease-Abgleich fehlgeschlagen: {err} – überspringe Durchlauf")
+                owned = set()
+            targets = [t for k, t in keys.items() if k in owned]
+            if not targets:
+                log.once(logging.getLogger("nakbot.lease"), "lease-idle",
+                         "Keine Leases – andere Worker pollen alle Transcripts, warte …")
+                _gui_send("STATUS", "Standby (Sharding)")
+                flightrec.end()
+                pause_s = reactive_sleep(pause_s)
+                continue
+
         if error_count > 0:
             logging.info("Versuche erneuten Login wegen vorherigem Fehler …")
             _gui_send("STATUS", "Reauthenticating…")
@@ -569,23 +865,40 @@ def main():
                 error_count = 0
             except RuntimeError as err:
                 logging.error(f"Login erneut fehlgeschlagen: {err}")
+                if _NET:
+                    _NET.note_failure()
+                flightrec.end(err)
+                flightrec.failure("login")
                 pause_s = reactive_sleep(pause_s)
                 continue
 
         logging.info(f"Check #{attempts}")
 
         try:
-            check_modules(session, patterns)
+            check_modules(session, patterns, targets, fresh)
             error_count = 0
+            for label, url in targets or ():
+                shard.mark_polled(_lease_key(username, url))
+            flightrec.end()
         except Exception as err:
             logging.warning(f"Fehler bei der Analyse: {err}")
+            flightrec.end(err)
+            flightrec.failure("fehler", sys.exc_info())
+            if _NET:
+                _NET.note_failure()  # vor dem nächsten Durchlauf Erreichbarkeit prüfen
+            api.STATE.failed(str(err))
             _gui_send("STATUS", "Fehler bei Analyse")
             error_count += 1
 
+        if watchdog and watchdog.enforce():
+            _gui_send("STATUS", "Neustart (Speicher)")
+            session.close()
+            return EXIT_RESTART
+
         pause_s = get_dynamic_pause_seconds(pause_s)
-        dlog(__name__, f"reactive_sleep({pause_s}s)")
+        dlog("pause", "reactive_sleep(%ss)", pause_s)
         # ← hier die neue reaktive Pause
         pause_s = reactive_sleep(pause_s)
 
 if __name__ == "__main__":
-    main()
+    sys.exit(main())
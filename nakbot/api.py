@@ -0,0 +1,202 @@
+# nakbot/api.py
+import os, json, time, logging, threading, collections, socketserver
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit, parse_qs
+from nakbot import metrics
+
+_log = logging.getLogger("nakbot.api")
+
+# ───────────────────────────────────────────────────────────────────────────────
+# Lokale Lese-API für den Notenstand (optional)
+#
+#   NAKBOT_API_PORT=8765          → http://127.0.0.1:8765/  (Host: NAKBOT_API_HOST)
+#   NAKBOT_API_SOCKET=/pfad.sock  → gleiche API über einen UNIX-Socket
+#
+#   GET /grades              aktuelle Notentabelle, Zeitpunkt des letzten Checks
+#   GET /history?since=<seq> Notenänderungen mit seq > since
+#   GET /metrics             Metriken-Snapshot (siehe nakbot/metrics.py)
+#
+# Ausgeliefert wird ausschließlich der Stand im Speicher, den main() nach jedem
+# Check über STATE.update() setzt – eine Abfrage löst nie einen CIS-Zugriff aus.
+# ETag/If-None-Match → 304. Long-Polling: ?wait=<s> hält die Anfrage, bis sich
+# der Stand ändert (bei /grades: nächster Check, bei /history: nächste Änderung).
+# ───────────────────────────────────────────────────────────────────────────────
+
+MAX_WAIT_S = 300
+
+
+class GradeState:
+    """Letzter Notenstand plus Änderungshistorie; Leser können auf Änderungen warten."""
+
+    def __init__(self, history: int = 500):
+        self._cond = threading.Condition()
+        self.revision = 0           # +1 pro verbuchtem Check (auch Fehler)
+        self.seq = 0                # +1 pro Notenänderung
+        self.grades: dict[str, str | None] = {}
+        self.source: str | None = None
+        self.checked_at: float | None = None
+        self.changed_at: float | None = None
+        self.last_error: str | None = None
+        self.history: collections.deque = collections.deque(maxlen=max(1, history))
+
+    def update(self, grades: dict[str, str | None], source: str) -> list[dict]:
+        """Ergebnis eines Checks verbuchen; liefert die neuen Historien-Einträge."""
+        now = time.time()
+        changes = []
+        with self._cond:
+            for module, grade in grades.items():
+                # erster Check nach dem Start ist die Ausgangslage, keine Änderung
+                if module in self.grades and self.grades[module] != grade:
+                    self.seq += 1
+                    changes.append({"seq": self.seq, "ts": now, "module": module,
+                                    "old": self.grades[module], "new": grade, "source": source})
+            self.history.extend(changes)
+            self.grades = dict(grades)
+            self.source = source
+            self.checked_at = now
+            self.last_error = None
+            if changes:
+                self.changed_at = now
+            self.revision += 1
+            self._cond.notify_all()
+        return changes
+
+    def failed(self, error: str) -> None:
+        with self._cond:
+            self.last_error = error
+            self.revision += 1
+            self._cond.notify_all()
+
+    def grades_view(self) -> tuple[str, dict]:
+        with self._cond:
+            return self._etag(self.revision), {
+                "grades": dict(self.grades),
+                "source": self.source,
+                "checked_at": self.checked_at,
+                "changed_at": self.changed_at,
+                "last_error": self.last_error,
+                "revision": self.revision,
+                "seq": self.seq,
+            }
+
+    def history_view(self, since: int = 0) -> tuple[str, dict]:
+        with self._cond:
+            # since gehört zum ETag: gleicher seq, anderes since → anderer Body
+            return f'"h{self.seq}-{since}"', {
+                "seq": self.seq,
+                "changes": [c for c in self.history if c["seq"] > since],
+            }
+
+    def wait(self, attr: str, seen: int, timeout: float) -> bool:
+        """Blockiert, bis getattr(self, attr) > seen oder timeout; True bei Änderung."""
+        deadline = time.monotonic() + min(max(0.0, timeout), MAX_WAIT_S)
+        with self._cond:
+            while getattr(self, attr) <= seen:
+                left = deadline - time.monotonic()
+                if left <= 0:
+                    return False
+                self._cond.wait(left)
+            return True
+
+    @staticmethod
+    def _etag(value: int, prefix: str = "r") -> str:
+        return f'"{prefix}{value}"'
+
+
+STATE = GradeState(history=int(os.getenv("NAKBOT_API_HISTORY", "500")))
+
+
+class _Handler(BaseHTTPRequestHandler):
+    server_version = "nakbot-api"
+    protocol_version = "HTTP/1.1"
+    state: GradeState = STATE
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        query = parse_qs(url.query)
+        try:
+            wait = float(query.get("wait", ["0"])[0])
+            since = int(query.get("since", ["0"])[0])
+        except ValueError:
+            return self._send(400, {"error": "wait/since müssen Zahlen sein"})
+
+        if url.path == "/grades":
+            etag, _ = self.state.grades_view()
+            if wait and self.headers.get("If-None-Match") == etag:
+                self.state.wait("revision", int(etag.strip('"r')), wait)
+            etag, body = self.state.grades_view()
+        elif url.path == "/history":
+            if wait:
+                self.state.wait("seq", since, wait)
+            etag, body = self.state.history_view(since)
+        elif url.path == "/metrics":
+            return self._send(200, metrics.snapshot())
+        else:
+            return self._send(404, {"error": "unbekannter Pfad", "paths": ["/grades", "/history", "/metrics"]})
+
+        if self.headers.get("If-None-Match") == etag:
+            return self._send(304, None, etag)
+        self._send(200, body, etag)
+
+    def _send(self, status: int, body, etag: str | None = None) -> None:
+        data = b"" if body is None else json.dumps(body, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        if etag:
+            self.send_header("ETag", etag)
+        self.send_header("Cache-Control", "no-cache")
+        if body is not None:
+            self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        if data:
+            self.wfile.write(data)
+        metrics.inc("api.requests")
+
+    def address_string(self):
+        # UNIX-Socket: client_address ist ein leerer String
+        return self.client_address[0] if isinstance(self.client_address, tuple) else "unix"
+
+    def log_message(self, fmt, *args):
+        _log.debug("%s %s", self.address_string(), fmt % args)
+
+
+class _UnixHTTPServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+    def server_bind(self):
+        # BaseHTTPRequestHandler erwartet server_name/server_port
+        socketserver.UnixStreamServer.server_bind(self)
+        self.server_name, self.server_port = "localhost", 0
+
+
+def start(port: int | None = None, host: str = "127.0.0.1", sock_path: str | None = None):
+    """Server im Hintergrund starten; liefert den Server (für shutdown()) oder None."""
+    if sock_path:
+        try:
+            os.remove(sock_path)
+        except FileNotFoundError:
+            pass
+        server = _UnixHTTPServer(sock_path, _Handler)
+        where = sock_path
+    elif port is not None:
+        server = ThreadingHTTPServer((host, port), _Handler)
+        server.daemon_threads = True
+        where = f"http://{host}:{server.server_address[1]}"
+    else:
+        return None
+    threading.Thread(target=server.serve_forever, name="nakbot-api", daemon=True).start()
+    _log.info(f"Noten-API aktiv: {where}")
+    return server
+
+
+def start_from_env():
+    """API laut NAKBOT_API_SOCKET / NAKBOT_API_PORT starten; Fehler nur loggen."""
+    sock_path = os.getenv("NAKBOT_API_SOCKET") or None
+    port = os.getenv("NAKBOT_API_PORT")
+    try:
+        return start(port=int(port) if port else None,
+                     host=os.getenv("NAKBOT_API_HOST", "127.0.0.1"),
+                     sock_path=sock_path)
+    except (OSError, ValueError) as e:
+        _log.warning(f"Noten-API konnte nicht gestartet werden: {e}")
+        return None
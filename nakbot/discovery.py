@@ -0,0 +1,171 @@
+# nakbot/discovery.py
+import os, json, time, logging, pathlib, threading
+from urllib.parse import urljoin, urlsplit, parse_qs
+from nakbot import env, overview
+
+_log = logging.getLogger("nakbot.discovery")
+
+# ───────────────────────────────────────────────────────────────────────────────
+# Transcript-Links und Login-Token aus den CIS-Seiten ermitteln
+#
+# Statt curriculumId/cHash/pid fest im Code zu halten, werden die Transcript-
+# Links (alle Curricula, eine Sprache je Curriculum) aus der Leistungsübersicht
+# gelesen und mit Zeitstempel in transcripts.json zwischengespeichert. Neu
+# aufgelöst wird nur, wenn der Cache älter als NAKBOT_DISCOVERY_TTL ist oder ein
+# Transcript mit 4xx bzw. ohne PDF antwortet. Die Seiten dafür holt der Bot
+# ohnehin (Login, Schnellweg) – zusätzliche Requests gibt es nur nach einem
+# Fehlschlag. Die eingebauten URLs bleiben Rückfallwert, solange nichts gefunden
+# wurde.
+# ───────────────────────────────────────────────────────────────────────────────
+
+_NS = "tx_nagrades_nagradesmodules"
+
+
+class TranscriptMoved(RuntimeError):
+    """Transcript-URL liefert 4xx oder kein PDF – Links müssen neu ermittelt werden."""
+
+    def __init__(self, url: str, reason: str):
+        super().__init__(f"Transcript nicht abrufbar ({reason})")
+        self.url = url
+        self.reason = reason
+
+
+def _param(url: str, name: str) -> str:
+    return parse_qs(urlsplit(url).query).get(f"{_NS}[{name}]", [""])[0]
+
+
+def find_transcripts(links: list[str], base_url: str) -> list[dict]:
+    """Alle Transcript-Links einer Seite als {url, curriculum, lang}."""
+    out, seen = [], set()
+    for href in links:
+        url = urljoin(base_url, href)
+        if _param(url, "action") != "transcript" or url in seen:
+            continue
+        seen.add(url)
+        out.append({"url": url, "curriculum": _param(url, "curriculumId"), "lang": _param(url, "lang")})
+    return out
+
+
+def pick(transcripts: list[dict], lang: str, curricula: set[str] | None = None) -> list[dict]:
+    """Je Curriculum ein Transcript, bevorzugt in Sprache `lang`; optional nur `curricula`."""
+    chosen: dict[str, dict] = {}
+    for t in transcripts:
+        if curricula and t["curriculum"] not in curricula:
+            continue
+        cur = chosen.get(t["curriculum"])
+        if cur is None or (t["lang"] == lang and cur["lang"] != lang):
+            chosen[t["curriculum"]] = t
+    return list(chosen.values())
+
+
+class Discovery:
+    def __init__(self, cache_path: pathlib.Path, fallback_url: str, fallback_pid: str,
+                 ttl_s: float = 7 * 86400, lang: str = "de", curricula: set[str] | None = None,
+                 enabled: bool = True):
+        self.cache_path = cache_path
+        self.fallback_url = fallback_url
+        self.fallback_pid = fallback_pid
+        self.ttl_s = ttl_s
+        self.lang = lang
+        self.curricula = curricula
+        self.enabled = enabled
+        self.transcripts: list[dict] = []
+        self.pid: str = fallback_pid
+        self.resolved_at = 0.0
+        self.invalid = False
+        self._lock = threading.Lock()
+        if enabled:
+            self._load()
+
+    # ── Cache ─────────────────────────────────────────────────────────────────
+    def _load(self) -> None:
+        try:
+            data = json.loads(self.cache_path.read_text(encoding="utf-8"))
+        except FileNotFoundError:
+            return
+        except (OSError, ValueError) as e:
+            _log.warning(f"Transcript-Cache {self.cache_path} unlesbar: {e}")
+            return
+        self.transcripts = data.get("transcripts") or []
+        self.pid = data.get("pid") or self.fallback_pid
+        self.resolved_at = float(data.get("resolved_at") or 0)
+
+    def _save(self) -> None:
+        data = {"transcripts": self.transcripts, "pid": self.pid, "resolved_at": self.resolved_at}
+        tmp = self.cache_path.with_suffix(self.cache_path.suffix + ".tmp")
+        try:
+            tmp.write_text(json.dumps(data, ensure_ascii=False, indent=1), encoding="utf-8")
+            os.replace(tmp, self.cache_path)
+        except OSError as e:
+            _log.warning(f"Transcript-Cache {self.cache_path} nicht schreibbar: {e}")
+
+    # ── Abfrage ───────────────────────────────────────────────────────────────
+    def needs_refresh(self) -> bool:
+        return self.enabled and (self.invalid or not self.transcripts
+                                 or time.time() - self.resolved_at > self.ttl_s)
+
+    def targets(self) -> list[tuple[str, str]]:
+        """(Label, URL) der zu prüfenden Transcripts; ohne Fund die eingebaute URL."""
+        with self._lock:
+            chosen = pick(self.transcripts, self.lang, self.curricula)
+        if not chosen:
+            return [("Transcript", self.fallback_url)]
+        if len(chosen) == 1:
+            return [("Transcript", chosen[0]["url"])]
+        return [(f"Curriculum {t['curriculum'] or '?'}", t["url"]) for t in chosen]
+
+    def replacement(self, old_url: str) -> str | None:
+        """Aktuelle URL für das Curriculum von old_url (None, wenn unbekannt)."""
+        cid = _param(old_url, "curriculumId")
+        with self._lock:
+            chosen = pick(self.transcripts, self.lang, self.curricula)
+        for t in chosen:
+            if t["curriculum"] == cid:
+                return t["url"]
+        return chosen[0]["url"] if len(chosen) == 1 else None
+
+    # ── Aktualisierung ────────────────────────────────────────────────────────
+    def invalidate(self, err: TranscriptMoved) -> None:
+        _log.warning(f"Transcript-Link ungültig ({err.reason}) – ermittle Links neu")
+        self.invalid = True
+
+    def observe(self, ov: overview.Overview, base_url: str) -> bool:
+        """Transcript-Links einer geladenen Übersicht übernehmen; True bei Änderung."""
+        if not self.needs_refresh():
+            return False
+        found = find_transcripts(ov.links, base_url)
+        if not found:
+            if ov.logged_in:
+                _log.warning("Keine Transcript-Links in der Leistungsübersicht gefunden – nutze bisherige")
+            return False
+        with self._lock:
+            old = {t["url"] for t in self.transcripts}
+            self.transcripts = found
+            self.resolved_at = time.time()
+            self.invalid = False
+            changed = old != {t["url"] for t in found}
+        self._save()
+        if changed:
+            _log.info("Transcripts ermittelt: " + ", ".join(
+                f"Curriculum {t['curriculum']} ({t['lang'] or '?'})" for t in found))
+        return changed
+
+    def observe_login(self, ov: overview.Overview) -> bool:
+        """pid aus dem Login-Formular übernehmen; True, wenn sie sich geändert hat."""
+        pid = ov.inputs.get("pid")
+        if not self.enabled or not pid or pid == self.pid:
+            return False
+        _log.info("Login-pid hat sich geändert – übernehme Wert aus dem Formular")
+        self.pid = pid
+        self._save()
+        return True
+
+
+def from_env(state_dir: pathlib.Path, fallback_url: str, fallback_pid: str) -> Discovery:
+    return Discovery(
+        state_dir / "transcripts.json", fallback_url, fallback_pid,
+        ttl_s=float(os.getenv("NAKBOT_DISCOVERY_TTL", str(7 * 86400))),
+        lang=os.getenv("NAKBOT_TRANSCRIPT_LANG", "de"),
+        curricula={c.strip() for c in os.getenv("NAKBOT_CURRICULA", "").split(",") if c.strip()} or None,
+        enabled=env.flag("NAKBOT_DISCOVERY", default=True),
+    )
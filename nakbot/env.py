@@ -0,0 +1,16 @@
+# nakbot/env.py
+import os
+
+# ───────────────────────────────────────────────────────────────────────────────
+# Schalter aus der Umgebung (NAKBOT_*): eine Schreibweise für alle Module
+# ───────────────────────────────────────────────────────────────────────────────
+
+def parse_bool(val: str | None) -> bool:
+    if val is None:
+        return False
+    return val.strip().lower() in {"1", "true", "yes", "on", "y"}
+
+
+def flag(name: str, default: bool = False) -> bool:
+    """Umgebungsvariable als Schalter; nicht gesetzt → default."""
+    return parse_bool(os.getenv(name, "1" if default else "0"))
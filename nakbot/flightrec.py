@@ -0,0 +1,156 @@
+# nakbot/flightrec.py
+import os, sys, json, time, signal, logging, pathlib, threading, traceback, collections
+from nakbot import env
+
+_log = logging.getLogger("nakbot.flightrec")
+
+# ───────────────────────────────────────────────────────────────────────────────
+# Flugschreiber: kompakte Ereignisse der letzten N Checks im Speicher
+#
+# Jeder Check bekommt einen Eintrag (begin/end), in den die Stellen im Bot
+# kurze Ereignisse schreiben: HTTP-Status, Dauer, Bytes, Prüfsumme,
+# Pipeline-Stufen, Schnellweg-Entscheidung, Ergebnis. Im Normalbetrieb ist das
+# nur ein list.append; geschrieben wird erst bei Bedarf:
+#   - Fehler in einem Check (main() ruft failure("fehler")) – nur der erste nach
+#     einem erfolgreichen Check, danach höchstens einer je NAKBOT_FLIGHTREC_INTERVAL
+#     und Grund, damit ein langer Ausfall nicht den Dump seines Beginns verdrängt
+#   - unbehandelte Exception im Haupt- oder einem Hintergrund-Thread
+#   - SIGUSR1 (Dump auf Zuruf, der Bot läuft weiter)
+# Dumps landen als JSON in NAKBOT_FLIGHTREC_DIR, die ältesten werden gelöscht.
+# ───────────────────────────────────────────────────────────────────────────────
+
+
+class FlightRecorder:
+    def __init__(self, checks: int = 20, per_check: int = 200, enabled: bool = True):
+        self.enabled = enabled and checks > 0
+        self.per_check = max(1, per_check)
+        self._checks: collections.deque = collections.deque(maxlen=max(1, checks))
+        self._current: dict | None = None
+        self._lock = threading.RLock()  # dump() läuft auch im Signal-Handler
+        self._failed_dumps: dict[str, float] = {}   # Grund -> letzter Fehler-Dump der laufenden Serie
+
+    def begin(self, check) -> None:
+        if not self.enabled:
+            return
+        rec = {"check": check, "started": time.time(), "_t0": time.monotonic(),
+               "events": [], "dropped": 0}
+        with self._lock:
+            self._checks.append(rec)
+            self._current = rec
+
+    def event(self, kind: str, **fields) -> None:
+        """Ereignis zum laufenden Check (aus jedem Thread; ohne begin() verworfen)."""
+        rec = self._current
+        if rec is None:
+            return
+        events = rec["events"]
+        if len(events) >= self.per_check:
+            rec["dropped"] += 1
+            return
+        events.append((round((time.monotonic() - rec["_t0"]) * 1000, 1), kind, fields))
+
+    def end(self, error: BaseException | None = None) -> None:
+        rec = self._current
+        if rec is None:
+            return
+        rec["ms"] = round((time.monotonic() - rec["_t0"]) * 1000, 1)
+        rec["ok"] = error is None
+        if error is not None:
+            rec["error"] = f"{type(error).__name__}: {error}"
+        else:
+            self._failed_dumps.clear()  # Erfolg beendet die Fehlerserie
+        self._current = None
+
+    def snapshot(self) -> list[dict]:
+        with self._lock:
+            checks = list(self._checks)
+        out = []
+        for rec in checks:
+            entry = {k: v for k, v in rec.items() if not k.startswith("_") and k != "events"}
+            entry["events"] = [{"t_ms": t, "kind": kind, **fields} for t, kind, fields in list(rec["events"])]
+            out.append(entry)
+        return out
+
+    def dump(self, reason: str, directory: pathlib.Path, keep: int = 20, exc_info=None) -> pathlib.Path | None:
+        if not self.enabled:
+            return None
+        payload = {"reason": reason, "ts": time.time(), "pid": os.getpid(), "checks": self.snapshot()}
+        if exc_info and exc_info[0] is not None:
+            payload["traceback"] = "".join(traceback.format_exception(*exc_info))
+        try:
+            directory.mkdir(parents=True, exist_ok=True)
+            stamp = time.strftime("%Y%m%d-%H%M%S")
+            path = directory / f"flightrec-{stamp}-{os.getpid()}-{reason}.json"
+            tmp = path.with_suffix(".tmp")
+            tmp.write_text(json.dumps(payload, ensure_ascii=False, indent=1, default=str), encoding="utf-8")
+            os.replace(tmp, path)
+            for old in sorted(directory.glob("flightrec-*.json"))[:-max(1, keep)]:
+                old.unlink(missing_ok=True)
+        except OSError as e:
+            _log.warning(f"Flugschreiber: Dump nach {directory} fehlgeschlagen: {e}")
+            return None
+        _log.info(f"Flugschreiber: letzte {len(payload['checks'])} Checks nach {path} geschrieben ({reason})")
+        return path
+
+    def dump_failure(self, reason: str, directory: pathlib.Path, keep: int = 20, exc_info=None,
+                     interval_s: float = 3600) -> pathlib.Path | None:
+        """Wie dump(), aber nur beim ersten Fehler seit dem letzten Erfolg (danach je interval_s)."""
+        now = time.monotonic()
+        with self._lock:
+            last = self._failed_dumps.get(reason)
+            if last is not None and now - last < interval_s:
+                _log.debug(f"Flugschreiber: Dump '{reason}' übersprungen (Fehlerserie, letzter vor {now - last:.0f}s)")
+                return None
+            self._failed_dumps[reason] = now
+        return self.dump(reason, directory, keep, exc_info)
+
+
+def _enabled() -> bool:
+    return env.flag("NAKBOT_FLIGHTREC", default=True)
+
+
+REC = FlightRecorder(checks=int(os.getenv("NAKBOT_FLIGHTREC_CHECKS", "20")), enabled=_enabled())
+_DIR = pathlib.Path(sys.argv[0]).resolve().parent / "flightrec"
+_KEEP = 20
+_INTERVAL = 3600.0
+
+begin = REC.begin
+event = REC.event
+end = REC.end
+
+
+def dump(reason: str, exc_info=None) -> pathlib.Path | None:
+    return REC.dump(reason, _DIR, _KEEP, exc_info)
+
+
+def failure(reason: str, exc_info=None) -> pathlib.Path | None:
+    """Dump nach fehlgeschlagenem Check/Login – gedrosselt je Fehlerserie und Grund."""
+    return REC.dump_failure(reason, _DIR, _KEEP, exc_info, _INTERVAL)
+
+
+def install(default_dir: pathlib.Path | None = None) -> None:
+    """Zielordner festlegen und Dumps bei Absturz und SIGUSR1 einhängen."""
+    global _DIR, _KEEP, _INTERVAL
+    if not REC.enabled:
+        return
+    _DIR = pathlib.Path(os.getenv("NAKBOT_FLIGHTREC_DIR") or default_dir or _DIR)
+    _KEEP = int(os.getenv("NAKBOT_FLIGHTREC_KEEP", "20"))
+    _INTERVAL = float(os.getenv("NAKBOT_FLIGHTREC_INTERVAL", "3600"))
+
+    prev_hook = sys.excepthook
+    def excepthook(exc_type, exc, tb):
+        if not issubclass(exc_type, (KeyboardInterrupt, SystemExit)):
+            dump("absturz", (exc_type, exc, tb))
+        prev_hook(exc_type, exc, tb)
+    sys.excepthook = excepthook
+
+    prev_thread_hook = threading.excepthook
+    def thread_excepthook(args):
+        if args.exc_type is not SystemExit:
+            dump(f"thread-{args.thread.name if args.thread else 'unbekannt'}",
+                 (args.exc_type, args.exc_value, args.exc_traceback))
+        prev_thread_hook(args)
+    threading.excepthook = thread_excepthook
+
+    if hasattr(signal, "SIGUSR1") and threading.current_thread() is threading.main_thread():
+        signal.signal(signal.SIGUSR1, lambda signum, frame: dump("signal"))
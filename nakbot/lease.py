@@ -0,0 +1,164 @@
+# nakbot/lease.py
+import os, math, time, socket, sqlite3, logging, threading
+
+_log = logging.getLogger("nakbot.lease")
+
+# ───────────────────────────────────────────────────────────────────────────────
+# Sharding über Leases in einer gemeinsamen SQLite-Datei (optional)
+#
+#   NAKBOT_LEASE_DB=/geteilt/nakbot-leases.sqlite
+#
+# Jeder Bot-Prozess (Worker) meldet sich in der Tabelle `workers` an und hält
+# zeitlich begrenzte Leases auf Ziele (Konto + Transcript-URL). Gepollt wird
+# nur, was man gerade hält. Ein Hintergrund-Thread verlängert die Leases alle
+# ttl/3 Sekunden; stirbt ein Worker, laufen seine Leases nach ttl Sekunden ab
+# und die übrigen übernehmen sie beim nächsten sync(). Jeder Worker nimmt sich
+# höchstens ceil(Ziele / aktive Worker seiner Gruppe), gibt Überschuss ab und
+# gleicht so die Last aus, wenn Worker hinzukommen. Gruppe = Konto: nur Worker
+# desselben Kontos bieten dieselben Ziele an; Worker anderer Konten dürfen den
+# Anteil nicht verkleinern, sonst bliebe ein Teil der Ziele ungepollt.
+#
+# Die Transaktionen laufen mit BEGIN IMMEDIATE – mehrere Hosts brauchen ein
+# Dateisystem mit funktionierenden Locks (lokal, nicht jedes NFS).
+# ───────────────────────────────────────────────────────────────────────────────
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS leases (
+    key     TEXT PRIMARY KEY,
+    owner   TEXT,
+    expires REAL NOT NULL DEFAULT 0,
+    polled  REAL NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS workers (
+    owner TEXT PRIMARY KEY,
+    host  TEXT,
+    seen  REAL NOT NULL,
+    grp   TEXT NOT NULL DEFAULT ''
+);
+"""
+
+
+def default_owner() -> str:
+    return os.getenv("NAKBOT_WORKER_ID") or f"{socket.gethostname()}-{os.getpid()}"
+
+
+class LeaseStore:
+    def __init__(self, path: str, owner: str | None = None, ttl_s: float = 120, group: str = ""):
+        self.path = path
+        self.owner = owner or default_owner()
+        self.group = group
+        self.ttl_s = max(5.0, ttl_s)
+        self.owned: set[str] = set()
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._conn = sqlite3.connect(path, timeout=30, isolation_level=None, check_same_thread=False)
+        self._conn.executescript(_SCHEMA)
+        # ältere Datei ohne Gruppen-Spalte nachrüsten
+        if "grp" not in {r[1] for r in self._conn.execute("PRAGMA table_info(workers)")}:
+            self._conn.execute("ALTER TABLE workers ADD COLUMN grp TEXT NOT NULL DEFAULT ''")
+
+    def _tx(self, fn):
+        """fn(cursor, now) in einer exklusiven Schreibtransaktion ausführen."""
+        with self._lock:
+            cur = self._conn.cursor()
+            cur.execute("BEGIN IMMEDIATE")
+            try:
+                result = fn(cur, time.time())
+                cur.execute("COMMIT")
+                return result
+            except BaseException:
+                cur.execute("ROLLBACK")
+                raise
+
+    def sync(self, keys: list[str]) -> set[str]:
+        """Anmelden, eigene Leases verlängern, Überschuss abgeben, freie Ziele übernehmen."""
+        keys = list(dict.fromkeys(keys))
+
+        def run(cur, now):
+            cur.execute("INSERT INTO workers(owner, host, seen, grp) VALUES (?, ?, ?, ?) "
+                        "ON CONFLICT(owner) DO UPDATE SET seen = excluded.seen, grp = excluded.grp",
+                        (self.owner, socket.gethostname(), now, self.group))
+            cur.execute("DELETE FROM workers WHERE seen < ?", (now - self.ttl_s,))
+            active = cur.execute("SELECT COUNT(*) FROM workers WHERE grp = ?", (self.group,)).fetchone()[0]
+            cur.executemany("INSERT OR IGNORE INTO leases(key) VALUES (?)", [(k,) for k in keys])
+            share = math.ceil(len(keys) / max(1, active))
+
+            rows = cur.execute("SELECT key, owner, expires, polled FROM leases").fetchall()
+            wanted = set(keys)
+            mine = sorted((r for r in rows if r[0] in wanted and r[1] == self.owner and r[2] > now),
+                          key=lambda r: r[3])
+            free = sorted((r for r in rows if r[0] in wanted and (r[1] is None or r[2] <= now)),
+                          key=lambda r: r[3])
+
+            keep = [r[0] for r in mine[:share]]
+            surplus = [r[0] for r in mine[share:]]
+            take = [r[0] for r in free[:max(0, share - len(keep))]]
+            cur.executemany("UPDATE leases SET owner = NULL, expires = 0 WHERE key = ? AND owner = ?",
+                            [(k, self.owner) for k in surplus])
+            cur.executemany("UPDATE leases SET owner = ?, expires = ? WHERE key = ?",
+                            [(self.owner, now + self.ttl_s, k) for k in keep + take])
+            return set(keep + take), surplus, take, active
+
+        owned, surplus, take, active = self._tx(run)
+        with self._lock:
+            self.owned = owned
+        if surplus or take:
+            _log.info(f"Leases: {len(owned)}/{len(keys)} Ziele bei {active} Worker(n) "
+                      f"(+{len(take)} übernommen, -{len(surplus)} abgegeben)")
+        return owned
+
+    def renew(self) -> set[str]:
+        """Gehaltene Leases verlängern; abgelaufene (z. B. nach Hänger) fallen heraus."""
+        def run(cur, now):
+            cur.execute("UPDATE workers SET seen = ? WHERE owner = ?", (now, self.owner))
+            cur.execute("UPDATE leases SET expires = ? WHERE owner = ? AND expires > ?",
+                        (now + self.ttl_s, self.owner, now))
+            return {r[0] for r in cur.execute("SELECT key FROM leases WHERE owner = ? AND expires > ?",
+                                              (self.owner, now))}
+
+        held = self._tx(run)
+        with self._lock:
+            lost = self.owned - held
+            self.owned &= held
+        if lost:
+            _log.warning(f"Leases verloren: {', '.join(sorted(lost))}")
+        return held
+
+    def mark_polled(self, key: str) -> None:
+        """Zeitpunkt des letzten Polls merken – ein Nachfolger übernimmt zuerst, was am längsten wartet."""
+        try:
+            self._tx(lambda cur, now: cur.execute(
+                "UPDATE leases SET polled = ? WHERE key = ? AND owner = ?", (now, key, self.owner)))
+        except sqlite3.Error as e:
+            _log.warning(f"Lease {key}: Poll-Zeitpunkt nicht gespeichert: {e}")
+
+    def release(self) -> None:
+        """Alles abgeben (beim Beenden), damit andere sofort übernehmen können."""
+        self._stop.set()
+        try:
+            self._tx(lambda cur, now: (
+                cur.execute("UPDATE leases SET owner = NULL, expires = 0 WHERE owner = ?", (self.owner,)),
+                cur.execute("DELETE FROM workers WHERE owner = ?", (self.owner,)),
+            ))
+        except sqlite3.Error as e:
+            _log.warning(f"Leases konnten nicht freigegeben werden: {e}")
+        with self._lock:
+            self.owned = set()
+
+    def start(self) -> None:
+        def run():
+            while not self._stop.wait(self.ttl_s / 3):
+                try:
+                    self.renew()
+                except sqlite3.Error as e:
+                    _log.warning(f"Lease-Verlängerung fehlgeschlagen: {e}")
+        threading.Thread(target=run, name="lease-renew", daemon=True).start()
+        _log.info(f"Sharding aktiv: Worker {self.owner}, Leases in {self.path} (TTL {self.ttl_s:.0f}s)")
+
+
+def from_env(group: str = "") -> LeaseStore | None:
+    """group: Konto – Worker teilen sich nur die Ziele ihrer eigenen Gruppe."""
+    path = os.getenv("NAKBOT_LEASE_DB")
+    if not path:
+        return None
+    return LeaseStore(path, ttl_s=float(os.getenv("NAKBOT_LEASE_TTL", "120")), group=group)
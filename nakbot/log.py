@@ -0,0 +1,191 @@
+# nakbot/log.py
+import os, json, time, signal, logging, threading
+
+# ───────────────────────────────────────────────────────────────────────────────
+# Logging-Setup
+#
+# - dlog(subsystem, "fmt %s", arg): formatiert erst, wenn wirklich geloggt wird
+#   (DEVLOG an oder Subsystem auf DEBUG). Teure Argumente in Lazy(...) packen.
+# - Level je Subsystem (Logger "nakbot.<name>"):
+#     NAKBOT_LOG_LEVELS="pdf=DEBUG,pause=WARNING"
+#   zur Laufzeit änderbar über die Datei NAKBOT_LOG_LEVELS_FILE (gleiches
+#   Format, eine Angabe pro Zeile oder kommagetrennt); neu gelesen bei
+#   Änderung bzw. sofort per SIGHUP.
+# - Gleiche Meldungen werden gedrosselt: mehr als NAKBOT_LOG_BURST Stück
+#   innerhalb NAKBOT_LOG_RATELIMIT_S Sekunden werden zusammengefasst.
+# - NAKBOT_LOG_JSON=<pfad>: zusätzlich JSON-Lines für maschinelle Auswertung
+# ───────────────────────────────────────────────────────────────────────────────
+
+ROOT = "nakbot"
+
+_LOGGERS: dict[str, logging.Logger] = {}
+
+
+def get(subsystem: str) -> logging.Logger:
+    """Logger für ein Subsystem ('pdf', 'pause', …) oder einen vollen Modulnamen."""
+    lg = _LOGGERS.get(subsystem)
+    if lg is None:
+        name = subsystem if ("." in subsystem or subsystem.startswith("__")) else f"{ROOT}.{subsystem}"
+        lg = _LOGGERS[subsystem] = logging.getLogger(name)
+    return lg
+
+
+def dlog(subsystem: str, msg: str, *args) -> None:
+    """Developer-Log. Kostet fast nichts, solange das Subsystem nicht auf DEBUG steht (DEVLOG: alle)."""
+    lg = get(subsystem)
+    if lg.isEnabledFor(logging.DEBUG):
+        lg.debug(f"[{subsystem}] {msg}", *args)
+
+
+_ONCE: set = set()
+
+def once(logger: logging.Logger, key: str, msg: str, *args, level: int = logging.INFO) -> None:
+    """Meldung nur beim ersten Auftreten von `key` (z. B. fehlende Konfiguration im Idle-Loop)."""
+    if key in _ONCE:
+        return
+    _ONCE.add(key)
+    logger.log(level, msg, *args)
+
+
+class Lazy:
+    """Wert erst beim Formatieren berechnen: dlog("net", "%s", Lazy(_short_repr, obj))."""
+    __slots__ = ("fn", "args")
+
+    def __init__(self, fn, *args):
+        self.fn = fn
+        self.args = args
+
+    def __str__(self):
+        return str(self.fn(*self.args))
+
+    __repr__ = __str__
+
+
+class RateLimitFilter(logging.Filter):
+    """Lässt pro Meldung (Logger, Level, Text, Argumente) nur `burst` Stück je Fenster durch."""
+
+    def __init__(self, window_s: float = 60.0, burst: int = 10):
+        super().__init__()
+        self.window_s = window_s
+        self.burst = max(1, burst)
+        self._seen: dict = {}
+        self._lock = threading.Lock()
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        # dieselbe Instanz hängt an mehreren Handlern – pro Record nur einmal zählen
+        decided = getattr(record, "_ratelimit", None)
+        if decided is not None:
+            return decided
+        if self.window_s <= 0:
+            return True
+        key = (record.name, record.levelno, record.msg, record.args)
+        try:
+            hash(key)
+        except TypeError:
+            key = (record.name, record.levelno, record.msg)
+        now = time.monotonic()
+        with self._lock:
+            start, count, suppressed = self._seen.get(key, (now, 0, 0))
+            if now - start > self.window_s:
+                start, count = now, 0
+                if suppressed:
+                    record.msg = f"{record.msg} [{suppressed}× unterdrückt]"
+                    suppressed = 0
+            count += 1
+            allowed = count <= self.burst
+            if not allowed:
+                suppressed += 1
+            self._seen[key] = (start, count, suppressed)
+            if len(self._seen) > 2000:
+                self._prune(now)
+        record._ratelimit = allowed
+        return allowed
+
+    def _prune(self, now: float) -> None:
+        for key, (start, _, _) in list(self._seen.items()):
+            if now - start > self.window_s:
+                del self._seen[key]
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": round(record.created, 3),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+            "thread": record.threadName,
+        }
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False)
+
+
+# ── Subsystem-Level ───────────────────────────────────────────────────────────
+
+_levels_file: str | None = None
+_levels_mtime = 0.0
+_reload_requested = False
+
+
+def apply_levels(spec: str) -> None:
+    """'pdf=DEBUG,pause=WARNING' (oder zeilenweise) auf die Subsystem-Logger anwenden."""
+    for part in spec.replace("\n", ",").split(","):
+        name, _, level = part.partition("=")
+        name, level = name.strip(), level.strip().upper()
+        if not name or not level or name.startswith("#"):
+            continue
+        if isinstance(logging.getLevelName(level), int):
+            get(name).setLevel(level)
+
+
+def reload_levels(force: bool = False) -> None:
+    """Level-Datei neu lesen, falls geändert (billiges stat(); aus dem Hauptloop aufrufen)."""
+    global _levels_mtime, _reload_requested
+    if not _levels_file:
+        return
+    try:
+        mtime = os.stat(_levels_file).st_mtime
+    except FileNotFoundError:
+        return
+    if not (force or _reload_requested or mtime != _levels_mtime):
+        return
+    _levels_mtime = mtime
+    _reload_requested = False
+    try:
+        with open(_levels_file, encoding="utf-8") as f:
+            apply_levels(f.read())
+        logging.info(f"Log-Level neu geladen aus {_levels_file}")
+    except OSError as e:
+        logging.warning(f"Log-Level-Datei {_levels_file} nicht lesbar: {e}")
+
+
+def _on_sighup(signum, frame) -> None:
+    global _reload_requested
+    _reload_requested = True
+
+
+def setup(devlog: bool = False) -> None:
+    global _levels_file
+    default = os.getenv("NAKBOT_LOG_LEVEL", "INFO").upper()
+    level = logging.DEBUG if devlog else (default if isinstance(logging.getLevelName(default), int) else logging.INFO)
+    logging.basicConfig(level=level, format="%(asctime)s | %(message)s")
+
+    root = logging.getLogger()
+    limiter = RateLimitFilter(
+        window_s=float(os.getenv("NAKBOT_LOG_RATELIMIT_S", "60")),
+        burst=int(os.getenv("NAKBOT_LOG_BURST", "10")),
+    )
+    json_path = os.getenv("NAKBOT_LOG_JSON")
+    if json_path:
+        handler = logging.FileHandler(json_path, encoding="utf-8")
+        handler.setFormatter(JsonFormatter())
+        root.addHandler(handler)
+    for handler in root.handlers:
+        handler.addFilter(limiter)
+
+    apply_levels(os.getenv("NAKBOT_LOG_LEVELS", ""))
+    _levels_file = os.getenv("NAKBOT_LOG_LEVELS_FILE")
+    reload_levels(force=True)
+    if _levels_file and hasattr(signal, "SIGHUP") and threading.current_thread() is threading.main_thread():
+        signal.signal(signal.SIGHUP, _on_sighup)
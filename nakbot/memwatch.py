@@ -0,0 +1,120 @@
+# nakbot/memwatch.py
+import os, gc, logging, threading, tracemalloc
+from typing import Callable
+from nakbot import env, metrics
+
+_log = logging.getLogger("nakbot.mem")
+
+# ───────────────────────────────────────────────────────────────────────────────
+# Speicher-Watchdog (optional, NAKBOT_MEMWATCH=1)
+#
+# Ein Hintergrund-Thread misst periodisch RSS und – mit NAKBOT_MEM_TRACEMALLOC=1 –
+# die größten Allokationsstellen und legt sie unter "mem.*" in den Metriken ab.
+# Eingegriffen wird nur an sicheren Stellen: main() ruft enforce() zwischen zwei
+# Checks auf. Über NAKBOT_MEM_SOFT_MB werden Caches geleert, über
+# NAKBOT_MEM_HARD_MB beendet sich der Bot geordnet und der Runner startet neu.
+# ───────────────────────────────────────────────────────────────────────────────
+
+def rss_kb() -> int:
+    """Aktuelle RSS des Prozesses in kB (Linux: /proc, sonst Peak via resource)."""
+    try:
+        with open("/proc/self/statm", encoding="ascii") as f:
+            pages = int(f.read().split()[1])
+        return pages * os.sysconf("SC_PAGE_SIZE") // 1024
+    except Exception:
+        try:
+            import resource
+            return int(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss)
+        except Exception:
+            return 0
+
+
+class MemoryWatchdog:
+    def __init__(self, interval_s: float = 60, soft_mb: int = 0, hard_mb: int = 0,
+                 trace: bool = False, top_n: int = 10):
+        self.interval_s = max(1.0, interval_s)
+        self.soft_kb = max(0, soft_mb) * 1024
+        self.hard_kb = max(0, hard_mb) * 1024
+        self.trace = trace
+        self.top_n = top_n
+        self.last_rss_kb = 0
+        self._trims: list[tuple[str, Callable[[], None]]] = []
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    def register_trim(self, name: str, fn: Callable[[], None]) -> None:
+        """Cache-Leerer, der beim Überschreiten des Soft-Limits aufgerufen wird."""
+        self._trims.append((name, fn))
+
+    def start(self) -> None:
+        if self.trace and not tracemalloc.is_tracing():
+            tracemalloc.start(1)
+        self._thread = threading.Thread(target=self._run, name="memwatch", daemon=True)
+        self._thread.start()
+        _log.info(
+            f"Speicher-Watchdog aktiv (alle {self.interval_s:.0f}s, "
+            f"soft={self.soft_kb // 1024 or '-'} MB, hard={self.hard_kb // 1024 or '-'} MB)"
+        )
+
+    def stop(self) -> None:
+        self._stop.set()
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval_s):
+            try:
+                self.sample()
+            except Exception as e:
+                _log.warning(f"Speicher-Watchdog: Messung fehlgeschlagen: {e}")
+
+    def sample(self) -> int:
+        self.last_rss_kb = rss_kb()
+        metrics.gauge("mem.rss_kb", self.last_rss_kb)
+        metrics.gauge("mem.gc_objects", len(gc.get_objects()))
+        if self.trace and tracemalloc.is_tracing():
+            current, peak = tracemalloc.get_traced_memory()
+            metrics.gauge("mem.traced_kb", current // 1024)
+            metrics.gauge("mem.traced_peak_kb", peak // 1024)
+            stats = tracemalloc.take_snapshot().statistics("lineno")[:self.top_n]
+            metrics.gauge("mem.top", [
+                {"where": f"{s.traceback[0].filename}:{s.traceback[0].lineno}",
+                 "kb": s.size // 1024, "count": s.count}
+                for s in stats
+            ])
+        metrics.write_file()
+        return self.last_rss_kb
+
+    def trim(self) -> None:
+        for name, fn in self._trims:
+            try:
+                fn()
+            except Exception as e:
+                _log.warning(f"Speicher-Watchdog: Trim {name} fehlgeschlagen: {e}")
+        gc.collect()
+        metrics.inc("mem.trims")
+
+    def enforce(self) -> bool:
+        """
+        Limits prüfen (nur vom Haupt-Thread zwischen zwei Checks aufrufen).
+        Gibt True zurück, wenn der Bot neu gestartet werden soll.
+        """
+        current = rss_kb()
+        if self.soft_kb and current > self.soft_kb:
+            _log.warning(f"Speicher: RSS {current // 1024} MB > Soft-Limit {self.soft_kb // 1024} MB – leere Caches")
+            self.trim()
+            current = rss_kb()
+        if self.hard_kb and current > self.hard_kb:
+            _log.error(f"Speicher: RSS {current // 1024} MB > Hard-Limit {self.hard_kb // 1024} MB – Neustart über Runner")
+            return True
+        return False
+
+
+def from_env() -> MemoryWatchdog | None:
+    """Watchdog aus NAKBOT_MEMWATCH* / NAKBOT_MEM_* bauen; None wenn deaktiviert."""
+    if not env.flag("NAKBOT_MEMWATCH"):
+        return None
+    return MemoryWatchdog(
+        interval_s=float(os.getenv("NAKBOT_MEMWATCH_INTERVAL", "60")),
+        soft_mb=int(os.getenv("NAKBOT_MEM_SOFT_MB", "0")),
+        hard_mb=int(os.getenv("NAKBOT_MEM_HARD_MB", "0")),
+        trace=env.flag("NAKBOT_MEM_TRACEMALLOC"),
+    )
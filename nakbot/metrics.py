@@ -0,0 +1,33 @@
+# nakbot/metrics.py
+import os, json, time, pathlib, threading
+
+# ───────────────────────────────────────────────────────────────────────────────
+# Metriken: prozessweite Kennzahlen (Name -> JSON-Wert)
+# Wer etwas misst, ruft gauge()/inc() auf; snapshot() liefert eine Kopie für Ausgaben.
+# Mit NAKBOT_METRICS_FILE wird der Stand regelmäßig als JSON abgelegt.
+# ───────────────────────────────────────────────────────────────────────────────
+
+_LOCK = threading.Lock()
+_VALUES: dict[str, object] = {}
+
+def gauge(name: str, value) -> None:
+    with _LOCK:
+        _VALUES[name] = value
+
+def inc(name: str, by: int = 1) -> None:
+    with _LOCK:
+        _VALUES[name] = int(_VALUES.get(name, 0)) + by
+
+def snapshot() -> dict:
+    with _LOCK:
+        return dict(_VALUES, ts=time.time())
+
+def write_file(path: str | None = None) -> None:
+    """Snapshot atomar nach NAKBOT_METRICS_FILE schreiben (falls gesetzt)."""
+    path = path or os.getenv("NAKBOT_METRICS_FILE")
+    if not path:
+        return
+    target = pathlib.Path(path)
+    tmp = target.with_suffix(target.suffix + ".tmp")
+    tmp.write_text(json.dumps(snapshot(), ensure_ascii=False, indent=1), encoding="utf-8")
+    os.replace(tmp, target)
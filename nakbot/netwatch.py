@@ -0,0 +1,198 @@
+# nakbot/netwatch.py
+import os, time, socket, struct, logging, threading
+from urllib.parse import urlsplit
+from requests.utils import get_environ_proxies
+from nakbot import env, metrics
+
+_log = logging.getLogger("nakbot.net")
+
+# ───────────────────────────────────────────────────────────────────────────────
+# Verbindungswächter: Polling parken, solange das Netz weg ist
+#
+# Signale:
+#   - Netlink (Linux): Link-/Adress-/Routenänderungen weckt den Wächter sofort
+#   - Uhrensprung: CLOCK_BOOTTIME (bzw. Wanduhr) läuft gegenüber CLOCK_MONOTONIC
+#     davon → der Rechner war im Suspend
+#   - fehlgeschlagener Check (main() ruft note_failure())
+# Nur nach einem dieser Signale wird geprüft, ob der CIS-Host erreichbar ist
+# (DNS-Auflösung + TCP-Connect, kein HTTP) – bzw. der Proxy aus HTTPS_PROXY/
+# HTTP_PROXY, wenn requests einen benutzen würde. Ist er es nicht, blockiert gate()
+# mit wachsendem Abstand zwischen den Proben, bis das Netz wieder da ist – statt
+# dass main() Login-Retries, Download-Backoff und Re-Login durchläuft. Danach
+# meldet gate() den Grund, main() prüft einmal die Session und checkt sofort.
+# ───────────────────────────────────────────────────────────────────────────────
+
+_RTMGRP_LINK = 0x1
+_RTMGRP_IPV4_IFADDR = 0x10
+_RTMGRP_IPV4_ROUTE = 0x40
+_RTMGRP_IPV6_IFADDR = 0x100
+_RTMGRP_IPV6_ROUTE = 0x400
+_NLMSG_HDR = struct.Struct("=LHHLL")
+_RTM_NAMES = {16: "Link neu", 17: "Link weg", 20: "Adresse neu", 21: "Adresse weg",
+              24: "Route neu", 25: "Route weg"}
+
+
+def _boot_clock() -> float:
+    """Uhr, die auch im Suspend weiterläuft."""
+    if hasattr(time, "CLOCK_BOOTTIME"):
+        return time.clock_gettime(time.CLOCK_BOOTTIME)
+    return time.time()
+
+
+class NetWatch:
+    def __init__(self, host: str, port: int = 443, probe_timeout_s: float = 3.0,
+                 min_wait_s: float = 5.0, max_wait_s: float = 60.0, jump_s: float = 30.0):
+        self.host = host
+        self.port = port
+        self.probe_timeout_s = probe_timeout_s
+        self.min_wait_s = min_wait_s
+        self.max_wait_s = max(min_wait_s, max_wait_s)
+        self.jump_s = jump_s
+        self.online = True
+        self._failed = False
+        self._changed = threading.Event()
+        self._change_what = ""
+        self._clock = (_boot_clock(), time.monotonic())
+
+    # ── Signale ───────────────────────────────────────────────────────────────
+    def start(self) -> None:
+        """Netlink-Listener starten (nur Linux; sonst bleiben Uhrensprung und Fehler)."""
+        try:
+            sock = socket.socket(socket.AF_NETLINK, socket.SOCK_RAW, socket.NETLINK_ROUTE)
+            sock.bind((0, _RTMGRP_LINK | _RTMGRP_IPV4_IFADDR | _RTMGRP_IPV4_ROUTE
+                       | _RTMGRP_IPV6_IFADDR | _RTMGRP_IPV6_ROUTE))
+        except (AttributeError, OSError) as e:
+            _log.info(f"Netlink nicht verfügbar ({e}) – erkenne Ausfälle über Fehler und Uhrensprung")
+            return
+        threading.Thread(target=self._listen, args=(sock,), name="netwatch", daemon=True).start()
+        _log.info(f"Verbindungswächter aktiv (Ziel {self.host}:{self.port})")
+
+    def _listen(self, sock: socket.socket) -> None:
+        while True:
+            try:
+                data = sock.recv(65536)
+            except OSError:
+                return
+            if len(data) >= _NLMSG_HDR.size:
+                msg_type = _NLMSG_HDR.unpack_from(data)[1]
+                self._change_what = _RTM_NAMES.get(msg_type, f"Typ {msg_type}")
+            self._changed.set()
+
+    def note_failure(self) -> None:
+        """Check/Login fehlgeschlagen – beim nächsten gate() Erreichbarkeit prüfen."""
+        self._failed = True
+
+    def _clock_jump(self) -> float:
+        boot, mono = _boot_clock(), time.monotonic()
+        jump = (boot - self._clock[0]) - (mono - self._clock[1])
+        self._clock = (boot, mono)
+        return jump if jump > self.jump_s else 0.0
+
+    # ── Erreichbarkeit ────────────────────────────────────────────────────────
+    def probe(self) -> bool:
+        """DNS + TCP-Connect zum CIS-Host; getaddrinfo hat kein Timeout, daher im Thread."""
+        result: list = []
+
+        def resolve():
+            try:
+                result.append(socket.getaddrinfo(self.host, self.port, type=socket.SOCK_STREAM))
+            except OSError as e:
+                result.append(e)
+
+        t = threading.Thread(target=resolve, name="netwatch-dns", daemon=True)
+        t.start()
+        t.join(self.probe_timeout_s)
+        if not result or isinstance(result[0], OSError):
+            reason = "DNS-Timeout" if not result else f"DNS: {result[0]}"
+            return self._set_online(False, reason)
+        for family, kind, proto, _, addr in result[0]:
+            try:
+                with socket.socket(family, kind, proto) as s:
+                    s.settimeout(self.probe_timeout_s)
+                    s.connect(addr)
+                return self._set_online(True)
+            except OSError as e:
+                reason = f"TCP: {e}"
+        return self._set_online(False, reason)
+
+    def _set_online(self, online: bool, reason: str = "") -> bool:
+        if online != self.online:
+            metrics.gauge("net.online", online)
+            if not online:
+                metrics.inc("net.offline_periods")
+                _log.warning(f"Offline: {self.host} nicht erreichbar ({reason}) – Polling pausiert")
+        self.online = online
+        return online
+
+    def wait_online(self, tick, on_offline=None) -> float:
+        """Blockiert, bis der Host erreichbar ist; tick() regelmäßig (Heartbeat). Gibt die Wartezeit zurück."""
+        if self.probe():
+            return 0.0
+        if on_offline:
+            on_offline()
+        t0 = time.monotonic()
+        delay = self.min_wait_s
+        while True:
+            deadline = time.monotonic() + delay
+            while (left := deadline - time.monotonic()) > 0:
+                tick()
+                if self._changed.wait(min(1.0, left)):
+                    self._changed.clear()
+                    break  # Netzänderung → sofort neu prüfen
+            if self.probe():
+                break
+            delay = min(self.max_wait_s, delay * 2)
+        waited = time.monotonic() - t0
+        self._clock = (_boot_clock(), time.monotonic())
+        _log.info(f"Wieder online nach {waited:.0f}s")
+        return waited
+
+    # ── Einstieg für main() ───────────────────────────────────────────────────
+    def gate(self, tick, on_offline=None) -> str | None:
+        """
+        Vor jedem Durchlauf aufrufen. None: normal weitermachen. Sonst Grund
+        (Resume, wieder online) – dann Session prüfen und sofort checken.
+        """
+        jump = self._clock_jump()
+        changed = self._changed.is_set()
+        failed = self._failed
+        if not (jump or changed or failed):
+            return None
+        self._changed.clear()
+        self._failed = False
+
+        waited = self.wait_online(tick, on_offline)
+        if waited:
+            return f"Netz wieder da nach {waited:.0f}s"
+        if jump:
+            return f"Resume nach ~{jump:.0f}s Suspend"
+        if changed:
+            _log.debug(f"Netzänderung ({self._change_what}) – Host erreichbar")
+        return None  # Host erreichbar: normale Fehlerbehandlung
+
+
+_DEFAULT_PORTS = {"https": 443, "http": 80, "socks5": 1080, "socks5h": 1080, "socks4": 1080}
+
+
+def probe_target(base_url: str) -> tuple[str, int]:
+    """Wohin requests die erste Verbindung aufbaut: Proxy (HTTPS_PROXY & Co., NO_PROXY beachtet) oder CIS-Host."""
+    url = urlsplit(base_url)
+    proxies = get_environ_proxies(base_url)
+    proxy = proxies.get(url.scheme) or proxies.get("all")
+    if proxy:
+        purl = urlsplit(proxy if "://" in proxy else f"http://{proxy}")
+        if purl.hostname:
+            return purl.hostname, purl.port or _DEFAULT_PORTS.get(purl.scheme, 80)
+    return url.hostname or "cis.nordakademie.de", url.port or _DEFAULT_PORTS.get(url.scheme, 80)
+
+
+def from_env(base_url: str) -> NetWatch | None:
+    if not env.flag("NAKBOT_NETWATCH", default=True):
+        return None
+    host, port = probe_target(base_url)
+    return NetWatch(
+        host=os.getenv("NAKBOT_NETWATCH_HOST") or host,
+        port=port,
+        max_wait_s=float(os.getenv("NAKBOT_OFFLINE_MAX_WAIT", "60")),
+        jump_s=float(os.getenv("NAKBOT_RESUME_JUMP_S", "30")),
+    )
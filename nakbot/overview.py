@@ -0,0 +1,165 @@
+# nakbot/overview.py
+import re, hashlib
+from html.parser import HTMLParser
+
+# ───────────────────────────────────────────────────────────────────────────────
+# Leistungsübersicht (HTML) als Schnellweg vor dem PDF-Transcript
+#
+# Die Übersichtsseite ist ein paar kB groß, das Transcript-PDF ein Vielfaches
+# davon und muss zusätzlich geparst werden. Pro Check wird deshalb zuerst die
+# Übersicht geholt:
+#   - Tabellenzeilen → Fingerabdruck; unverändert ⇒ Noten vom letzten PDF gelten
+#   - Noten direkt aus der Tabelle, aber erst, nachdem sie einmal mit dem PDF
+#     übereingestimmt haben (sonst könnte z. B. eine ECTS-Spalte als Note gelten)
+# ───────────────────────────────────────────────────────────────────────────────
+
+_WS_RE = re.compile(r"\s+")
+
+
+class _OverviewParser(HTMLParser):
+    """Sammelt Tabellenzeilen (Zellen mit Leerzeichen verbunden), sichtbaren Text, Links und Formularfelder."""
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.rows: list[str] = []
+        self.text: list[str] = []
+        self.links: list[str] = []
+        self.inputs: dict[str, str] = {}
+        self.cells: set[int] = set()    # vorkommende Spaltenzahlen (Tabellen-Layout)
+        self._row: list[str] | None = None
+        self._row_cells = 0
+        self._skip = 0
+
+    def handle_starttag(self, tag, attrs):
+        if tag in ("script", "style", "noscript"):
+            self._skip += 1
+        elif tag == "tr":
+            self._row = []
+            self._row_cells = 0
+        elif tag in ("td", "th") and self._row is not None:
+            self._row_cells += 1
+        elif tag == "a":
+            href = dict(attrs).get("href")
+            if href:
+                self.links.append(href)
+        elif tag == "input":
+            a = dict(attrs)
+            if a.get("name"):
+                self.inputs.setdefault(a["name"], a.get("value") or "")
+
+    def handle_endtag(self, tag):
+        if tag in ("script", "style", "noscript") and self._skip:
+            self._skip -= 1
+        elif tag == "tr" and self._row is not None:
+            row = _WS_RE.sub(" ", " ".join(self._row)).strip()
+            if row:
+                self.rows.append(row)
+                self.cells.add(self._row_cells)
+            self._row = None
+
+    def handle_data(self, data):
+        if self._skip:
+            return
+        if self._row is not None:
+            self._row.append(data)
+        self.text.append(data)
+
+
+class Overview:
+    def __init__(self, html: str):
+        p = _OverviewParser()
+        p.feed(html)
+        p.close()
+        self.rows = p.rows
+        self.links = p.links
+        self.inputs = p.inputs
+        self.layout = tuple(sorted(p.cells))
+        self.logged_in = "Benutzeranmeldung" not in html
+        basis = "\n".join(self.rows) if self.rows else _WS_RE.sub(" ", " ".join(p.text))
+        self.fingerprint = hashlib.sha256(basis.encode("utf-8")).hexdigest()
+
+    def grades(self, patterns: dict) -> dict[str, str | None]:
+        """Noten aus den Tabellenzeilen, gleiche Muster wie beim PDF."""
+        out: dict[str, str | None] = {}
+        for module, pattern in patterns.items():
+            out[module] = None
+            for row in self.rows:
+                m = pattern.search(row)
+                if m:
+                    out[module] = m.group(1).strip()
+                    break
+        return out
+
+
+class FastPath:
+    """
+    Entscheidet pro Check, ob das PDF nötig ist.
+    pdf_every: spätestens nach so vielen Checks ohne PDF trotzdem das PDF laden.
+    """
+
+    def __init__(self, pdf_every: int = 50):
+        self.pdf_every = max(1, pdf_every)
+        self.etag: str | None = None
+        self.last_modified: str | None = None
+        self.overview: Overview | None = None
+        self.pdf_fingerprint: str | None = None
+        self.pdf_grades: dict[str, str | None] | None = None
+        self.html_trusted = False
+        self.trusted_layout: tuple | None = None
+        self.since_pdf = 0
+
+    def request_headers(self) -> dict:
+        """Conditional-GET-Header für die Übersichtsseite."""
+        headers = {}
+        if self.etag:
+            headers["If-None-Match"] = self.etag
+        if self.last_modified:
+            headers["If-Modified-Since"] = self.last_modified
+        return headers
+
+    def update(self, status: int, html: str, headers) -> Overview | None:
+        """Antwort verbuchen; bei 304 bleibt die letzte Übersicht gültig."""
+        if status == 304 and self.overview is not None:
+            return self.overview
+        self.etag = headers.get("ETag")
+        self.last_modified = headers.get("Last-Modified")
+        self.overview = Overview(html)
+        return self.overview
+
+    def lookup(self, patterns: dict) -> tuple[dict[str, str | None] | None, str]:
+        """
+        Noten ohne PDF, falls möglich. Rückgabe (grades, quelle) mit quelle
+        'html' / 'cache'; (None, grund) heißt: PDF laden.
+        """
+        ov = self.overview
+        if ov is None:
+            return None, "keine Übersicht"
+        if self.pdf_grades is None:
+            return None, "noch kein PDF-Abgleich"
+        if self.since_pdf >= self.pdf_every:
+            return None, f"Kontroll-PDF nach {self.since_pdf} Checks"
+
+        # nur bei unverändertem Tabellen-Layout – eine neue Spalte könnte sonst als Note gelten
+        if self.html_trusted and ov.layout == self.trusted_layout:
+            grades = ov.grades(patterns)
+            if all(g is not None for g in grades.values()):
+                self.since_pdf += 1
+                return grades, "html"
+
+        if (ov.fingerprint == self.pdf_fingerprint and self.pdf_grades is not None
+                and patterns.keys() <= self.pdf_grades.keys()):
+            self.since_pdf += 1
+            return {m: self.pdf_grades[m] for m in patterns}, "cache"
+        return None, "Übersicht geändert"
+
+    def pdf_result(self, grades: dict[str, str | None], patterns: dict) -> None:
+        """PDF-Ergebnis merken und die HTML-Noten daran prüfen."""
+        self.pdf_grades = dict(grades)
+        self.since_pdf = 0
+        if self.overview is None:
+            return
+        self.pdf_fingerprint = self.overview.fingerprint
+        html = self.overview.grades(patterns)
+        found = {m: g for m, g in html.items() if g is not None}
+        self.html_trusted = bool(found) and len(found) == len(html) and all(grades.get(m) == g for m, g in found.items())
+        self.trusted_layout = self.overview.layout
@@ -0,0 +1,537 @@
+# nakbot/pdf_backends.py
+import io, re, os, sys, json, time, zlib, hashlib, pathlib, logging
+
+_log = logging.getLogger("nakbot.pdf")
+
+# ───────────────────────────────────────────────────────────────────────────────
+# PDF-Text-Backends
+#
+#   pypdf2  – bisheriger Weg, Referenz für alle anderen
+#   pymupdf – deutlich schneller, nur wenn `fitz` installiert ist
+#   scan    – eingebauter Content-Stream-Scanner für das NAK-Transcript
+#
+# NAKBOT_PDF_BACKEND=auto wählt das schnellste Backend, das auf den
+# aufgezeichneten Transcripts (NAKBOT_PDF_FIXTURES) exakt dieselben Noten
+# liefert wie PyPDF2. Ohne Fixtures bleibt es bei PyPDF2. Scheitert ein Backend
+# an einem echten Transcript, wird mit PyPDF2 neu gelesen und das Backend (auch
+# im Cache .backend.json) für auto gesperrt.
+#
+# Benchmark von Hand:  python -m nakbot.pdf_backends <fixtures-dir> [modules.txt]
+# ───────────────────────────────────────────────────────────────────────────────
+
+class PdfBackend:
+    name = "base"
+
+    def available(self) -> bool:
+        return True
+
+    def extract(self, data: bytes) -> str:
+        raise NotImplementedError
+
+
+class PyPDF2Backend(PdfBackend):
+    name = "pypdf2"
+
+    def available(self) -> bool:
+        try:
+            import PyPDF2  # noqa: F401
+            return True
+        except ImportError:
+            return False
+
+    def extract(self, data: bytes) -> str:
+        from PyPDF2 import PdfReader
+        return "\n".join(p.extract_text() or "" for p in PdfReader(io.BytesIO(data)).pages)
+
+
+class PyMuPDFBackend(PdfBackend):
+    name = "pymupdf"
+
+    def available(self) -> bool:
+        try:
+            import fitz  # noqa: F401
+            return True
+        except ImportError:
+            return False
+
+    def extract(self, data: bytes) -> str:
+        import fitz
+        with fitz.open(stream=data, filetype="pdf") as doc:
+            return "\n".join(page.get_text() for page in doc)
+
+
+# ── Eingebauter Scanner ───────────────────────────────────────────────────────
+
+_OBJ_RE = re.compile(rb"(\d+)\s+(\d+)\s+obj\b")
+_REF_RE = re.compile(rb"(\d+)\s+\d+\s+R")
+_STREAM_RE = re.compile(rb"stream\r?\n")
+_LENGTH_RE = re.compile(rb"/Length\s+(\d+)\b(?!\s+\d+\s+R)")
+_TOKEN_RE = re.compile(
+    rb"\s*(?:"
+    rb"(?P<str>\()"
+    rb"|<(?P<hex>[0-9A-Fa-f\s]*)>"
+    rb"|(?P<dict><<|>>)"
+    rb"|(?P<arr>[\[\]])"
+    rb"|(?P<name>/[^\s/\[\]()<>{}%]*)"
+    rb"|(?P<num>[+-]?(?:\d+\.?\d*|\.\d+))"
+    rb"|(?P<op>[A-Za-z'\"*][A-Za-z0-9'\"*]*)"
+    rb"|(?P<other>\S)"
+    rb")"
+)
+_ESCAPES = {ord("n"): 10, ord("r"): 13, ord("t"): 9, ord("b"): 8, ord("f"): 12}
+
+
+def _read_literal(buf: bytes, pos: int) -> tuple[bytes, int]:
+    """Liest einen (…)-String ab pos (hinter der öffnenden Klammer)."""
+    out = bytearray()
+    depth = 1
+    n = len(buf)
+    while pos < n:
+        c = buf[pos]
+        if c == 0x5C:  # Backslash
+            pos += 1
+            if pos >= n:
+                break
+            c = buf[pos]
+            if c in _ESCAPES:
+                out.append(_ESCAPES[c])
+            elif 0x30 <= c <= 0x37:
+                digits = buf[pos:pos + 3]
+                m = re.match(rb"[0-7]{1,3}", digits)
+                out.append(int(m.group(0), 8) & 0xFF)
+                pos += len(m.group(0)) - 1
+            elif c in (0x0A, 0x0D):
+                pass  # Zeilenfortsetzung
+            else:
+                out.append(c)
+        elif c == 0x28:
+            depth += 1
+            out.append(c)
+        elif c == 0x29:
+            depth -= 1
+            if depth == 0:
+                return bytes(out), pos + 1
+            out.append(c)
+        else:
+            out.append(c)
+        pos += 1
+    return bytes(out), pos
+
+
+def _tokens(buf: bytes):
+    pos = 0
+    n = len(buf)
+    while pos < n:
+        m = _TOKEN_RE.match(buf, pos)
+        if not m or m.end() == pos:
+            return
+        pos = m.end()
+        kind = m.lastgroup
+        if kind == "str":
+            s, pos = _read_literal(buf, pos)
+            yield "str", s
+        elif kind == "hex":
+            h = re.sub(rb"\s", b"", m.group("hex"))
+            if len(h) % 2:
+                h += b"0"
+            yield "str", bytes.fromhex(h.decode("ascii"))
+        elif kind == "other" and m.group("other") == b"%":
+            nl = buf.find(b"\n", pos)
+            pos = n if nl < 0 else nl + 1
+        else:
+            yield kind, m.group(kind)
+
+
+def _parse_cmap(data: bytes) -> tuple[dict[int, str], int]:
+    """ToUnicode-CMap → (code → Text, Codebreite in Bytes)."""
+    mapping: dict[int, str] = {}
+    width = 1
+    m = re.search(rb"begincodespacerange\s*<([0-9A-Fa-f]+)>", data)
+    if m:
+        width = max(1, len(m.group(1)) // 2)
+
+    def uni(h: bytes) -> str:
+        return bytes.fromhex(h.decode("ascii")).decode("utf-16-be", errors="replace")
+
+    for block in re.findall(rb"beginbfchar(.*?)endbfchar", data, re.S):
+        for src, dst in re.findall(rb"<([0-9A-Fa-f]+)>\s*<([0-9A-Fa-f]*)>", block):
+            mapping[int(src, 16)] = uni(dst)
+    for block in re.findall(rb"beginbfrange(.*?)endbfrange", data, re.S):
+        for lo, hi, rest in re.findall(rb"<([0-9A-Fa-f]+)>\s*<([0-9A-Fa-f]+)>\s*(<[0-9A-Fa-f]*>|\[[^\]]*\])", block):
+            lo_i, hi_i = int(lo, 16), int(hi, 16)
+            if rest.startswith(b"["):
+                for i, h in enumerate(re.findall(rb"<([0-9A-Fa-f]*)>", rest)):
+                    mapping[lo_i + i] = uni(h)
+            else:
+                base = bytes.fromhex(rest[1:-1].decode("ascii"))
+                head, last = base[:-2], int.from_bytes(base[-2:] or b"\0\0", "big")
+                for i in range(hi_i - lo_i + 1):
+                    mapping[lo_i + i] = (head + (last + i).to_bytes(2, "big")).decode("utf-16-be", errors="replace")
+    return mapping, width
+
+
+class ScanBackend(PdfBackend):
+    """
+    Minimaler Text-Scanner: liest die Content-Streams der Seiten direkt und
+    wertet nur Textoperatoren aus (Tf, Tj, TJ, ', ", Td, TD, Tm, T*).
+    Reicht für das tabellarische NAK-Transcript, nicht für beliebige PDFs.
+    """
+    name = "scan"
+
+    def extract(self, data: bytes) -> str:
+        objects = self._objects(data)
+        pages = self._pages(objects)
+        return "\n".join(self._page_text(objects, page, owner) for page, owner in pages)
+
+    # ── Objekte ──
+    def _objects(self, data: bytes) -> dict[int, tuple[bytes, bytes | None]]:
+        objects: dict[int, tuple[bytes, bytes | None]] = {}
+        pos = 0
+        while True:
+            m = _OBJ_RE.search(data, pos)
+            if not m:
+                break
+            start = m.end()
+            stream = None
+            sm = _STREAM_RE.search(data, start)
+            end = data.find(b"endobj", start)
+            if end < 0:
+                break
+            if sm and sm.start() < end:
+                # Stream-Länge bevorzugt aus /Length, damit Binärdaten mit
+                # zufälligem 'endobj' darin nicht abgeschnitten werden
+                head = data[start:sm.start()]
+                length = _LENGTH_RE.search(head)
+                raw_end = sm.end() + int(length.group(1)) if length else data.find(b"endstream", sm.end())
+                if raw_end < sm.end():
+                    break
+                stream = self._decode(head, data[sm.end():raw_end])
+                end = data.find(b"endobj", raw_end)
+                body = head
+            else:
+                body = data[start:end]
+            objects[int(m.group(1))] = (body, stream)
+            pos = end + 6 if end >= 0 else len(data)
+
+        # komprimierte Objekt-Streams (PDF 1.5+)
+        for num, (body, stream) in list(objects.items()):
+            if stream is None or b"/ObjStm" not in body:
+                continue
+            first = re.search(rb"/First\s+(\d+)", body)
+            if first is None:
+                continue
+            first = int(first.group(1))
+            header = [int(x) for x in stream[:first].split()]
+            offsets = list(zip(header[::2], header[1::2]))
+            for i, (onum, off) in enumerate(offsets):
+                end = first + offsets[i + 1][1] if i + 1 < len(offsets) else len(stream)
+                objects.setdefault(onum, (stream[first + off:end], None))
+        return objects
+
+    @staticmethod
+    def _decode(head: bytes, raw: bytes) -> bytes:
+        if b"/FlateDecode" in head:
+            try:
+                return zlib.decompress(raw)
+            except zlib.error:
+                return zlib.decompressobj().decompress(raw)
+        return raw
+
+    @staticmethod
+    def _ref(body: bytes, key: bytes) -> int | None:
+        m = re.search(re.escape(key) + rb"\s+(\d+)\s+\d+\s+R", body)
+        return int(m.group(1)) if m else None
+
+    def _pages(self, objects) -> list[tuple[bytes, bytes]]:
+        """
+        Seiten in Dokument-Reihenfolge (über /Kids) als (Seite, Resources-Träger);
+        /Resources kann vom /Pages-Knoten geerbt sein. Fallback: Objekt-Reihenfolge.
+        """
+        root = next((b for b, _ in objects.values() if re.search(rb"/Type\s*/Catalog", b)), None)
+        pages: list[tuple[bytes, bytes]] = []
+
+        def walk(num: int | None, inherited: bytes, depth: int = 0) -> None:
+            if num is None or num not in objects or depth > 32:
+                return
+            body = objects[num][0]
+            owner = body if b"/Resources" in body else inherited
+            if re.search(rb"/Type\s*/Pages", body):
+                kids = re.search(rb"/Kids\s*\[([^\]]*)\]", body)
+                for ref in _REF_RE.findall(kids.group(1) if kids else b""):
+                    walk(int(ref), owner, depth + 1)
+            elif re.search(rb"/Type\s*/Page\b", body):
+                pages.append((body, owner))
+
+        if root is not None:
+            walk(self._ref(root, b"/Pages"), b"")
+        if not pages:
+            pages = [(b, b) for b, _ in objects.values() if re.search(rb"/Type\s*/Page\b", b)]
+        return pages
+
+    def _resolve(self, objects, body: bytes, key: bytes) -> bytes:
+        """Dict-Eintrag, direkt (<<…>>) oder als Referenz."""
+        ref = self._ref(body, key)
+        if ref is not None and ref in objects:
+            return objects[ref][0]
+        m = re.search(re.escape(key) + rb"\s*<<", body)
+        if not m:
+            return b""
+        depth, i = 1, m.end()
+        while i < len(body) and depth:
+            if body.startswith(b"<<", i):
+                depth, i = depth + 1, i + 2
+            elif body.startswith(b">>", i):
+                depth, i = depth - 1, i + 2
+            else:
+                i += 1
+        return body[m.end():i - 2]
+
+    def _fonts(self, objects, owner: bytes) -> dict[bytes, tuple[dict[int, str], int]]:
+        res = self._resolve(objects, owner, b"/Resources")
+        fonts = self._resolve(objects, res, b"/Font")
+        out = {}
+        for name, ref in re.findall(rb"/([^\s/<>\[\]()]+)\s+(\d+)\s+\d+\s+R", fonts):
+            body = objects.get(int(ref), (b"", None))[0]
+            tu = self._ref(body, b"/ToUnicode")
+            if tu is not None and objects.get(tu, (b"", None))[1] is not None:
+                out[b"/" + name] = _parse_cmap(objects[tu][1])
+            else:
+                out[b"/" + name] = ({}, 1)
+        return out
+
+    def _page_text(self, objects, page: bytes, owner: bytes) -> str:
+        contents = re.search(rb"/Contents\s*(\[[^\]]*\]|\d+\s+\d+\s+R)", page)
+        if not contents:
+            return ""
+        stream = b"\n".join(objects.get(int(r), (b"", b""))[1] or b"" for r in _REF_RE.findall(contents.group(1)))
+        fonts = self._fonts(objects, owner)
+
+        out: list[str] = []
+        operands: list = []
+        array: list | None = None
+        cmap, width = {}, 1
+        # Zeilenursprung im Textraum; Zeilenwechsel, sobald sich y ändert
+        line_y, leading = 0.0, 0.0
+        last_y: float | None = None
+        moved = False
+
+        def show(s: bytes) -> None:
+            nonlocal last_y, moved
+            if last_y is not None and abs(line_y - last_y) > 0.01:
+                if out and not out[-1].endswith("\n"):
+                    out.append("\n")
+            elif moved and out and not out[-1].endswith((" ", "\n")):
+                out.append(" ")
+            last_y, moved = line_y, False
+            if cmap:
+                codes = [int.from_bytes(s[i:i + width], "big") for i in range(0, len(s), width)]
+                out.append("".join(cmap.get(c, "") for c in codes))
+            else:
+                out.append(s.decode("cp1252", errors="replace"))
+
+        def next_line() -> None:
+            nonlocal line_y, moved
+            line_y -= leading
+            moved = True
+
+        for kind, val in _tokens(stream):
+            if kind == "arr":
+                if val == b"[":
+                    array = []
+                else:
+                    operands.append(array or [])
+                    array = None
+                continue
+            if kind == "op":
+                op = val
+                if op == b"BT":
+                    line_y, moved = 0.0, True
+                elif op == b"Tf" and len(operands) >= 2 and isinstance(operands[-2], bytes):
+                    cmap, width = fonts.get(operands[-2], ({}, 1))
+                elif op == b"TL" and operands:
+                    leading = operands[-1]
+                elif op == b"Tj" and operands and isinstance(operands[-1], bytes):
+                    show(operands[-1])
+                elif op in (b"'", b'"') and operands and isinstance(operands[-1], bytes):
+                    next_line()
+                    show(operands[-1])
+                elif op == b"TJ" and operands and isinstance(operands[-1], list):
+                    for item in operands[-1]:
+                        if isinstance(item, bytes):
+                            show(item)
+                        elif item < -200:
+                            moved = True
+                elif op in (b"Td", b"TD") and len(operands) >= 2:
+                    if op == b"TD":
+                        leading = -operands[-1]
+                    line_y += operands[-1]
+                    moved = True
+                elif op == b"Tm" and len(operands) >= 6:
+                    line_y, moved = operands[-1], True
+                elif op == b"T*":
+                    next_line()
+                operands = []
+                continue
+
+            if kind == "num":
+                v = float(val)
+            elif kind in ("str", "name"):
+                v = val
+            else:
+                continue
+            (array if array is not None else operands).append(v)
+
+        return "".join(out).strip("\n")
+
+
+BACKENDS: dict[str, PdfBackend] = {b.name: b for b in (PyPDF2Backend(), PyMuPDFBackend(), ScanBackend())}
+REFERENCE = "pypdf2"
+
+# ───────────────────────────────────────────────────────────────────────────────
+# Benchmark / Auswahl
+# ───────────────────────────────────────────────────────────────────────────────
+
+def _grades(text: str, patterns: dict) -> dict[str, str | None]:
+    from nakbot.pdfworker import match_grades
+    return match_grades(text, patterns)
+
+def _normalize(text: str) -> str:
+    return " ".join(text.split())
+
+def fixture_files(fixtures_dir: pathlib.Path) -> list[pathlib.Path]:
+    return sorted(fixtures_dir.glob("*.pdf")) if fixtures_dir.is_dir() else []
+
+def benchmark(fixtures: list[pathlib.Path], patterns: dict, rounds: int = 3) -> list[dict]:
+    """
+    Misst jedes verfügbare Backend über alle Fixtures. Ein Backend ist nur
+    'ok', wenn es auf jedem Fixture dieselben Noten liefert wie PyPDF2. Findet
+    PyPDF2 selbst keine einzige Note, sagt der Notenvergleich nichts aus – dann
+    muss der Text (bis auf Leerraum) übereinstimmen.
+    """
+    blobs = [f.read_bytes() for f in fixtures]
+    ref_raw = [BACKENDS[REFERENCE].extract(b) for b in blobs]
+    reference = [_grades(t, patterns) for t in ref_raw]
+    ref_texts = [_normalize(t) for t in ref_raw]
+    informative = any(g is not None for grades in reference for g in grades.values())
+    results = []
+    for backend in BACKENDS.values():
+        if not backend.available():
+            continue
+        try:
+            best = float("inf")
+            for _ in range(max(1, rounds)):
+                t0 = time.perf_counter()
+                texts = [backend.extract(b) for b in blobs]
+                got = [_grades(t, patterns) for t in texts]
+                best = min(best, time.perf_counter() - t0)
+            ok = got == reference
+            if ok and not informative and backend.name != REFERENCE:
+                ok = [_normalize(t) for t in texts] == ref_texts
+        except Exception as e:
+            _log.warning(f"PDF-Backend {backend.name} fehlgeschlagen: {e}")
+            best, ok = float("inf"), False
+        results.append({"backend": backend.name, "seconds": best, "ok": ok})
+    return sorted(results, key=lambda r: (not r["ok"], r["seconds"]))
+
+def _cache_key(fixtures: list[pathlib.Path], patterns: dict) -> str:
+    h = hashlib.sha256(b"v2\n")   # v2: Textvergleich, wenn die Referenz keine Noten findet
+    for f in fixtures:
+        st = f.stat()
+        h.update(f"{f.name}:{st.st_size}:{st.st_mtime_ns}\n".encode())
+    h.update("\n".join(sorted(patterns)).encode())
+    h.update(",".join(n for n, b in BACKENDS.items() if b.available()).encode())
+    return h.hexdigest()
+
+def auto_select(fixtures_dir: pathlib.Path | None, patterns: dict) -> str:
+    """Schnellstes verifiziertes Backend; Ergebnis wird neben den Fixtures gecacht."""
+    fixtures = fixture_files(fixtures_dir) if fixtures_dir else []
+    if not fixtures or not patterns:
+        return REFERENCE
+    cache = fixtures_dir / ".backend.json"
+    key = _cache_key(fixtures, patterns)
+    bad = set()
+    try:
+        cached = json.loads(cache.read_text(encoding="utf-8"))
+        bad = set(cached.get("bad") or ())
+        if cached.get("key") == key and cached["backend"] not in bad:
+            return cached["backend"]
+    except (FileNotFoundError, ValueError, KeyError):
+        pass
+    _BAD.update(bad)
+
+    results = [r for r in benchmark(fixtures, patterns) if r["backend"] not in _BAD]
+    choice = results[0]["backend"] if results and results[0]["ok"] else REFERENCE
+    _log.info("PDF-Backend-Benchmark: " + ", ".join(
+        f"{r['backend']}={r['seconds'] * 1000:.1f}ms{'' if r['ok'] else ' (abweichend)'}" for r in results))
+    _log.info(f"PDF-Backend gewählt: {choice}")
+    try:
+        cache.write_text(json.dumps({"key": key, "backend": choice, "results": results,
+                                     "bad": sorted(_BAD)}), encoding="utf-8")
+    except OSError as e:
+        _log.warning(f"PDF-Backend-Cache nicht schreibbar: {e}")
+    return choice
+
+_SELECTED: dict[str, str] = {}
+_BAD: set[str] = set()   # Backends, die auf einem echten Transcript gescheitert sind
+
+def mark_bad(name: str) -> None:
+    """Backend nach einem Fehler sperren – hier und im Cache, damit auto es nicht wieder wählt."""
+    if name == REFERENCE or name in _BAD:
+        return
+    _BAD.add(name)
+    if _SELECTED.get("auto") == name:
+        _SELECTED["auto"] = REFERENCE
+    fixtures = os.getenv("NAKBOT_PDF_FIXTURES")
+    if not fixtures:
+        return
+    cache = pathlib.Path(fixtures) / ".backend.json"
+    try:
+        cached = json.loads(cache.read_text(encoding="utf-8"))
+    except (FileNotFoundError, ValueError):
+        return
+    cached["bad"] = sorted(set(cached.get("bad") or ()) | {name})
+    if cached.get("backend") == name:
+        cached["backend"] = REFERENCE
+    try:
+        cache.write_text(json.dumps(cached), encoding="utf-8")
+    except OSError as e:
+        _log.warning(f"PDF-Backend-Cache nicht schreibbar: {e}")
+
+def resolve(name: str, patterns: dict) -> PdfBackend:
+    """Backend-Namen (inkl. 'auto') auflösen; Auswahl einmal pro Prozess."""
+    name = (name or "auto").strip().lower()
+    if name == "auto":
+        if "auto" not in _SELECTED:
+            fixtures = os.getenv("NAKBOT_PDF_FIXTURES")
+            _SELECTED["auto"] = auto_select(pathlib.Path(fixtures) if fixtures else None, patterns)
+        name = _SELECTED["auto"]
+    backend = BACKENDS.get(name)
+    if name in _BAD:
+        backend = BACKENDS[REFERENCE]
+    elif backend is None or not backend.available():
+        _log.warning(f"PDF-Backend {name!r} nicht verfügbar – nutze {REFERENCE}")
+        backend = BACKENDS[REFERENCE]
+    return backend
+
+def record_fixture(fixtures_dir: pathlib.Path, data: bytes, keep: int = 5) -> None:
+    """Heruntergeladenes Transcript als Fixture ablegen (nur neue Inhalte, max. `keep`)."""
+    fixtures_dir.mkdir(parents=True, exist_ok=True)
+    digest = hashlib.sha256(data).hexdigest()[:16]
+    target = fixtures_dir / f"transcript-{digest}.pdf"
+    if target.exists():
+        return
+    target.write_bytes(data)
+    for old in sorted(fixture_files(fixtures_dir), key=lambda f: f.stat().st_mtime)[:-keep]:
+        old.unlink(missing_ok=True)
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s | %(message)s")
+    if len(sys.argv) < 2:
+        print("Aufruf: python -m nakbot.pdf_backends <fixtures-dir> [modules.txt]")
+        sys.exit(2)
+    fixtures = fixture_files(pathlib.Path(sys.argv[1]))
+    modules_file = pathlib.Path(sys.argv[2] if len(sys.argv) > 2 else "modules.txt")
+    lines = [l.strip() for l in modules_file.read_text(encoding="utf-8").splitlines() if l.strip()]
+    patterns = {m: re.compile(rf"{re.escape(m)}\s+([^\s]+)", re.I) for m in lines}
+    for r in benchmark(fixtures, patterns):
+        print(f"{r['backend']:8} {r['seconds'] * 1000:8.1f} ms  {'ok' if r['ok'] else 'abweichend'}")
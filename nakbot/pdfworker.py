@@ -0,0 +1,158 @@
+# nakbot/pdfworker.py
+import os, logging, atexit, threading, concurrent.futures as cf, multiprocessing as mp
+from concurrent.futures.process import BrokenProcessPool
+from multiprocessing import shared_memory
+from nakbot import pdf_backends
+from nakbot.memwatch import rss_kb
+
+_log = logging.getLogger("nakbot.pdf")
+
+# ───────────────────────────────────────────────────────────────────────────────
+# PDF-Worker: Parsing in einem separaten, vorgewärmten Prozess
+#
+# Der Bot läuft wochenlang. PyPDF2 erzeugt pro Transcript viele kurzlebige
+# Objekte, die den Heap des Hauptprozesses fragmentieren und die RSS langsam
+# anwachsen lassen. Deshalb parst ein eigener Prozess das PDF: die Bytes gehen
+# per Shared Memory rüber, zurück kommt nur die Notentabelle {Modul: Note}.
+# ───────────────────────────────────────────────────────────────────────────────
+
+def extract_text(data: bytes, patterns: dict | None = None) -> str:
+    """Text über das konfigurierte Backend (NAKBOT_PDF_BACKEND, Standard: auto)."""
+    backend = pdf_backends.resolve(os.getenv("NAKBOT_PDF_BACKEND", "auto"), patterns or {})
+    try:
+        return backend.extract(data)
+    except Exception as e:
+        if backend.name == pdf_backends.REFERENCE:
+            raise
+        # schnelles Backend scheitert an diesem PDF → Referenz, und künftig nicht mehr wählen
+        _log.warning(f"PDF-Backend {backend.name} fehlgeschlagen ({type(e).__name__}: {e}) – "
+                     f"nutze {pdf_backends.REFERENCE}")
+        pdf_backends.mark_bad(backend.name)
+        return pdf_backends.BACKENDS[pdf_backends.REFERENCE].extract(data)
+
+def match_grades(text: str, patterns: dict) -> dict[str, str | None]:
+    """Notentabelle aus dem Transcript-Text: Modul -> Note (None = Zeile fehlt)."""
+    grades = {}
+    for module, pattern in patterns.items():
+        m = pattern.search(text)
+        grades[module] = m.group(1).strip() if m else None
+    return grades
+
+# ── Worker-Seite ──────────────────────────────────────────────────────────────
+
+def _init_worker() -> None:
+    # Vorwärmen: teure Imports passieren beim Prozessstart, nicht beim ersten Job
+    for backend in pdf_backends.BACKENDS.values():
+        backend.available()
+
+def _warm() -> int:
+    return os.getpid()
+
+def _parse_job(shm_name: str, size: int, patterns: dict) -> tuple[dict, int]:
+    shm = shared_memory.SharedMemory(name=shm_name)
+    try:
+        data = bytes(shm.buf[:size])
+    finally:
+        shm.close()
+    grades = match_grades(extract_text(data, patterns), patterns)
+    return grades, rss_kb()
+
+# ── Hauptprozess-Seite ────────────────────────────────────────────────────────
+
+class PdfWorkerPool:
+    """
+    Persistenter Pool aus `workers` Parse-Prozessen.
+    - workers=0: Parsing inline im Hauptprozess (altes Verhalten)
+    - jeder Prozess wird nach `max_jobs` Jobs ersetzt
+    - überschreitet ein Worker `max_rss_mb`, wird der ganze Pool recycelt
+    - parse() ist threadsicher (Pipeline mit parse>1): Start, Submit und Recycling
+      laufen unter einem Lock, recycelt wird nur der Pool, den der Aufrufer benutzt hat
+    """
+
+    def __init__(self, workers: int = 1, max_jobs: int = 50, max_rss_mb: int = 256, timeout_s: int = 120):
+        self.workers = max(0, workers)
+        self.max_jobs = max(1, max_jobs)
+        self.max_rss_kb = max(0, max_rss_mb) * 1024
+        self.timeout_s = timeout_s
+        self._executor: cf.ProcessPoolExecutor | None = None
+        self._lock = threading.Lock()
+
+    def _start(self) -> None:
+        self._executor = cf.ProcessPoolExecutor(
+            max_workers=self.workers,
+            mp_context=mp.get_context("spawn"),
+            initializer=_init_worker,
+            max_tasks_per_child=self.max_jobs,
+        )
+        # Prozesse sofort starten statt beim ersten Check
+        for _ in range(self.workers):
+            self._executor.submit(_warm)
+        _log.info(f"PDF-Worker gestartet ({self.workers} Prozess(e), Recycling nach {self.max_jobs} Jobs)")
+
+    def _submit(self, *args) -> tuple[cf.ProcessPoolExecutor, cf.Future]:
+        with self._lock:
+            if self._executor is None:
+                self._start()
+            return self._executor, self._executor.submit(*args)
+
+    def recycle(self, kill: bool = False, executor: cf.ProcessPoolExecutor | None = None) -> None:
+        """Pool beenden; mit `executor` nur, wenn das noch der aktuelle ist (sonst schon ersetzt)."""
+        with self._lock:
+            if self._executor is None or (executor is not None and executor is not self._executor):
+                return
+            old, self._executor = self._executor, None
+        if kill:
+            # hängende Worker hart beenden, sonst blockiert shutdown() auf ihnen
+            for proc in list(getattr(old, "_processes", {}).values()):
+                proc.terminate()
+        old.shutdown(wait=not kill, cancel_futures=True)
+
+    def close(self) -> None:
+        self.recycle()
+
+    def parse(self, data: bytes | memoryview, patterns: dict) -> dict[str, str | None]:
+        if self.workers == 0:
+            return match_grades(extract_text(bytes(data), patterns), patterns)
+
+        size = len(data)
+        shm = shared_memory.SharedMemory(create=True, size=max(1, size))
+        try:
+            shm.buf[:size] = data
+            for attempt in (1, 2):
+                executor = None
+                try:
+                    executor, fut = self._submit(_parse_job, shm.name, size, patterns)
+                    grades, rss_kb = fut.result(timeout=self.timeout_s)
+                    break
+                except (BrokenProcessPool, cf.TimeoutError, cf.CancelledError) as err:
+                    # CancelledError: ein paralleles parse() hat den Pool gerade recycelt
+                    self.recycle(kill=True, executor=executor)
+                    # nie inline parsen: ein PDF, das den Worker abstürzen lässt oder hängt,
+                    # täte das sonst im Bot-Prozess. Absturz → einmal in frischem Worker
+                    # wiederholen, Timeout → Check sofort fehlschlagen lassen.
+                    if attempt == 2 or isinstance(err, cf.TimeoutError):
+                        _log.warning(f"PDF-Worker ausgefallen ({type(err).__name__}) – Check abgebrochen, Pool wird neu gestartet")
+                        raise RuntimeError("PDF-Worker ausgefallen") from err
+                    _log.warning(f"PDF-Worker ausgefallen ({type(err).__name__}) – neuer Versuch in frischem Worker")
+        finally:
+            shm.close()
+            shm.unlink()
+
+        if self.max_rss_kb and rss_kb > self.max_rss_kb:
+            _log.info(f"PDF-Worker RSS {rss_kb // 1024} MB > {self.max_rss_kb // 1024} MB – recycle Pool")
+            self.recycle(executor=executor)
+        return grades
+
+_POOL: PdfWorkerPool | None = None
+
+def get_pool() -> PdfWorkerPool:
+    """Prozessweiter Pool, konfiguriert über NAKBOT_PDF_WORKERS / _MAX_JOBS / _MAX_RSS_MB."""
+    global _POOL
+    if _POOL is None:
+        _POOL = PdfWorkerPool(
+            workers=int(os.getenv("NAKBOT_PDF_WORKERS", "1")),
+            max_jobs=int(os.getenv("NAKBOT_PDF_WORKER_MAX_JOBS", "50")),
+            max_rss_mb=int(os.getenv("NAKBOT_PDF_WORKER_MAX_RSS_MB", "256")),
+        )
+        atexit.register(_POOL.close)
+    return _POOL
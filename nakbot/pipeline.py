@@ -0,0 +1,146 @@
+# nakbot/pipeline.py
+import time, queue, logging, threading
+from typing import Callable
+from nakbot import metrics, flightrec
+
+_log = logging.getLogger("nakbot.pipeline")
+
+# ───────────────────────────────────────────────────────────────────────────────
+# Gestufte Verarbeitung mit begrenzten Queues
+#
+# Jede Stufe hat eigene Worker-Threads und eine Eingangs-Queue mit fester
+# Größe. Ist eine Stufe langsam, blockiert put() der vorherigen (Backpressure),
+# statt dass sich Zwischenergebnisse (z. B. PDF-Puffer) im Speicher stapeln.
+# Bei mehreren Transcripts läuft so der nächste Download, während das vorige
+# PDF geparst wird.
+# ───────────────────────────────────────────────────────────────────────────────
+
+_DONE = object()
+
+
+class StageFailed:
+    """Platzhalter für ein Element, das in einer Stufe fehlgeschlagen ist."""
+
+    def __init__(self, item, stage: str, error: Exception):
+        self.item = item
+        self.stage = stage
+        self.error = error
+
+
+class Stage:
+    def __init__(self, name: str, fn: Callable, workers: int = 1, queue_size: int = 2):
+        self.name = name
+        self.fn = fn
+        self.workers = max(1, workers)
+        self.queue: queue.Queue = queue.Queue(maxsize=max(1, queue_size))
+        self.processed = 0
+        self.busy_s = 0.0
+        self.max_s = 0.0
+        self.max_depth = 0
+        self._lock = threading.Lock()
+        self._alive = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            avg = self.busy_s / self.processed if self.processed else 0.0
+            return {"processed": self.processed, "avg_ms": round(avg * 1000, 1),
+                    "max_ms": round(self.max_s * 1000, 1), "max_queue": self.max_depth,
+                    "queue": self.queue.qsize()}
+
+
+class Pipeline:
+    """
+    Stufen werden nacheinander durchlaufen; fn(item) liefert das Element für die
+    nächste Stufe. Fehler landen als StageFailed im Ergebnis, die übrigen
+    Elemente laufen weiter.
+    """
+
+    def __init__(self, stages: list[Stage]):
+        self.stages = stages
+
+    def run(self, items) -> list:
+        results: list = []
+        results_lock = threading.Lock()
+        threads = []
+
+        for idx, stage in enumerate(self.stages):
+            nxt = self.stages[idx + 1] if idx + 1 < len(self.stages) else None
+            stage._alive = stage.workers
+            for n in range(stage.workers):
+                t = threading.Thread(target=self._work, args=(stage, nxt, results, results_lock),
+                                     name=f"pipeline-{stage.name}-{n}", daemon=True)
+                t.start()
+                threads.append(t)
+
+        first = self.stages[0]
+        for item in items:
+            self._put(first, item)
+        for _ in range(first.workers):
+            first.queue.put(_DONE)
+        for t in threads:
+            t.join()
+
+        self.report()
+        return results
+
+    @staticmethod
+    def _put(stage: Stage, item) -> None:
+        stage.queue.put(item)  # blockiert, wenn die Stufe voll ist (Backpressure)
+        depth = stage.queue.qsize()
+        with stage._lock:
+            stage.max_depth = max(stage.max_depth, depth)
+
+    def _work(self, stage: Stage, nxt: Stage | None, results: list, results_lock: threading.Lock) -> None:
+        while True:
+            item = stage.queue.get()
+            if item is _DONE:
+                break
+            if isinstance(item, StageFailed):
+                out = item
+            else:
+                t0 = time.perf_counter()
+                try:
+                    out = stage.fn(item)
+                except Exception as e:
+                    _log.warning(f"Pipeline-Stufe {stage.name} fehlgeschlagen: {e}")
+                    out = StageFailed(item, stage.name, e)
+                dt = time.perf_counter() - t0
+                flightrec.event("stage", stage=stage.name, ms=round(dt * 1000, 1),
+                                error=str(out.error) if isinstance(out, StageFailed) else None)
+                with stage._lock:
+                    stage.processed += 1
+                    stage.busy_s += dt
+                    stage.max_s = max(stage.max_s, dt)
+            if nxt is not None:
+                self._put(nxt, out)
+            else:
+                with results_lock:
+                    results.append(out)
+
+        # letzter Worker dieser Stufe beendet die nächste
+        with stage._lock:
+            stage._alive -= 1
+            last = stage._alive == 0
+        if last and nxt is not None:
+            for _ in range(nxt.workers):
+                nxt.queue.put(_DONE)
+
+    def report(self) -> None:
+        parts = []
+        for stage in self.stages:
+            st = stage.stats()
+            metrics.gauge(f"pipeline.{stage.name}", st)
+            parts.append(f"{stage.name}={st['avg_ms']}ms/max {st['max_ms']}ms q≤{st['max_queue']}")
+        _log.info("Pipeline: " + ", ".join(parts))
+
+
+def parse_parallelism(spec: str | None) -> dict[str, int]:
+    """'fetch=2,parse=1' → {'fetch': 2, 'parse': 1}; ungültige Teile werden ignoriert."""
+    out: dict[str, int] = {}
+    for part in (spec or "").split(","):
+        name, _, val = part.partition("=")
+        try:
+            out[name.strip()] = max(1, int(val))
+        except ValueError:
+            continue
+    return out
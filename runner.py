@@ -1,10 +1,17 @@
 import os
+import gzip
+import shutil
+import logging
+import logging.handlers
 import subprocess
+import threading
 import time
 import pathlib
 import datetime
 import traceback
 
+from supervisor import Supervisor
+
 # ── Pfade ─────────────────────────────────────────────
 SOURCE = pathlib.Path(__file__).resolve().parent
 MAIN = SOURCE / "nakbot" / "__main__.py"
@@ -13,6 +20,11 @@ BUILD = SOURCE / "nakbot.pyz"
 REQS = SOURCE / "requirements.txt"
 LOGS = SOURCE / "runner.log"
 
+# ── Log-Rotation ──────────────────────────────────────
+LOG_MAX_BYTES = int(os.getenv("RUNNER_LOG_MAX_BYTES", str(5 * 1024 * 1024)))
+LOG_BACKUPS = int(os.getenv("RUNNER_LOG_BACKUPS", "5"))
+LOG_WHEN = os.getenv("RUNNER_LOG_WHEN")  # z. B. "midnight" → zeit- statt größenbasiert
+
 # ── Datei-Zeitstempel ─────────────────────────────────
 def get_mtime(path):
     try:
@@ -21,12 +33,44 @@ def get_mtime(path):
         return 0
 
 # ── Logging ───────────────────────────────────────────
+# Ein einziger, gepufferter Handle auf runner.log für Runner und Bot-Ausgabe.
+# Alte Segmente werden rotiert und gzip-komprimiert (runner.log.1.gz, …).
+def _gzip_rotator(source, dest):
+    with open(source, "rb") as src, gzip.open(dest, "wb") as dst:
+        shutil.copyfileobj(src, dst)
+    os.remove(source)
+
+def _make_log_sink():
+    if LOG_WHEN:
+        handler = logging.handlers.TimedRotatingFileHandler(
+            LOGS, when=LOG_WHEN, backupCount=LOG_BACKUPS, encoding="utf-8", delay=True)
+    else:
+        handler = logging.handlers.RotatingFileHandler(
+            LOGS, maxBytes=LOG_MAX_BYTES, backupCount=LOG_BACKUPS, encoding="utf-8", delay=True)
+    handler.namer = lambda name: name + ".gz"
+    handler.rotator = _gzip_rotator
+    handler.setFormatter(logging.Formatter("[%(asctime)s] %(message)s", "%Y-%m-%d %H:%M:%S"))
+
+    # Puffer: geschrieben wird bei 200 Einträgen, bei Fehlern oder per flush() im Hauptloop
+    buffer = logging.handlers.MemoryHandler(capacity=200, flushLevel=logging.ERROR, target=handler)
+    logger = logging.getLogger("nakbot.runner")
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
+    logger.addHandler(buffer)
+    return logger, buffer
+
+LOG_SINK, LOG_BUFFER = _make_log_sink()
+
 def log(msg):
     timestamp = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-    entry = f"[{timestamp}] {msg}"
-    print(entry)
-    with LOGS.open("a", encoding="utf-8") as f:
-        f.write(entry + "\n")
+    print(f"[{timestamp}] {msg}")
+    LOG_SINK.info(msg)
+
+# ── Bot-Ausgabe mit Zeitstempel ins Log ───────────────
+def pipe_output(stream):
+    for line in iter(stream.readline, b""):
+        LOG_SINK.info("[bot] %s", line.decode(errors="replace").rstrip())
+    stream.close()
 
 # ── Build mit shiv ────────────────────────────────────
 def build():
@@ -45,15 +89,18 @@ def build():
         raise
 
 # ── Ausführen + Logfile ───────────────────────────────
-def run():
+def run(supervisor):
     log("Starte neue .pyz …")
     try:
-        log_file = LOGS.open("a", encoding="utf-8")
-        return subprocess.Popen(
+        process = subprocess.Popen(
             ["python3", str(BUILD)],
-            stdout=log_file,
-            stderr=log_file
+            stdout=subprocess.PIPE,
+            stderr=subprocess.STDOUT,
+            env=supervisor.env()
         )
+        threading.Thread(target=pipe_output, args=(process.stdout,), daemon=True).start()
+        supervisor.started()
+        return process
     except Exception as e:
         log(f"Fehler beim Start der .pyz: {e}")
         traceback.print_exc()
@@ -62,6 +109,7 @@ def run():
 # ── Hauptfunktion ─────────────────────────────────────
 def main():
     log("Runner gestartet")
+    supervisor = Supervisor(log)
     try:
         last_mtime_main = get_mtime(MAIN)
         last_mtime_modules = get_mtime(MODULES)
@@ -70,15 +118,32 @@ def main():
             log("nakbot.pyz nicht gefunden – baue neu …")
             build()
 
-        process = run()
+        process = run(supervisor)
+        restart_at = None
 
         while True:
             time.sleep(3)
+            LOG_BUFFER.flush()
+
+            # ── Exit erkannt ──
+            if process is not None and process.poll() is not None:
+                delay = supervisor.exited(process.returncode)
+                process = None
+                restart_at = None if delay is None else time.time() + delay
+
+            # ── Hänger erkannt (Heartbeat veraltet) ──
+            elif process is not None and supervisor.is_hung():
+                log(f"Kein Heartbeat seit {supervisor.heartbeat_age():.0f}s – beende Bot-Prozess …")
+                process.kill()
+                process.wait()
+                delay = supervisor.exited(None)
+                process = None
+                restart_at = time.time() + delay
 
-            # ── Absturz erkannt ──
-            if process.poll() is not None:
-                log(f"Bot-Prozess unerwartet beendet mit Code {process.returncode} – Neustart …")
-                process = run()
+            # ── Neustart fällig ──
+            if process is None and restart_at is not None and time.time() >= restart_at:
+                process = run(supervisor)
+                restart_at = None
 
             # ── Codeänderung erkannt ──
             changed = False
@@ -97,14 +162,20 @@ def main():
 
             if changed:
                 log("Neubaue .pyz wegen Änderung …")
-                process.terminate()
-                process.wait()
+                if process is not None:
+                    process.terminate()
+                    process.wait()
                 build()
-                process = run()
+                supervisor.reset()
+                process = run(supervisor)
+                restart_at = None
 
     except Exception as e:
         log(f"[FATAL] Runner abgestürzt: {e}")
         traceback.print_exc()
+    finally:
+        supervisor.cleanup()
+        LOG_BUFFER.flush()
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,289 @@
+import os
+import sys
+import json
+import time
+import random
+import shutil
+import socket
+import argparse
+import pathlib
+import tempfile
+import threading
+import subprocess
+import urllib.request
+
+from cis_sim import CisSimulator, parse_faults, FAULT_KINDS
+
+# ── Soak-/Fehlertest gegen den lokalen CIS-Simulator ──
+# Startet den Simulator und N Bot-Instanzen (python -m nakbot, eigene Konten,
+# eigener NAKBOT_HOME), spielt Notenänderungen und Fehler nach Fahrplan ein und
+# misst pro Instanz: Requests/Minute, Re-Logins, RSS- und FD-Wachstum sowie die
+# Zeit bis zur Erkennung einer Notenänderung (über die Noten-API /history).
+# Ergebnis als Tabelle + JSON; Exit-Code 1, wenn ein Grenzwert gerissen wurde.
+#
+#   python3 soak.py --duration 3600 --instances 4 --faults "5xx@600+60:0.5,expire@1200,layout@1800"
+
+SOURCE = pathlib.Path(__file__).resolve().parent
+GRADES = ["1,0", "1,3", "1,7", "2,0", "2,3", "2,7", "3,0", "3,3", "3,7", "4,0"]
+
+
+# ── Hilfen ────────────────────────────────────────────
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+def serve_pause(path, seconds):
+    """Pause-Socket wie im GUI-Runner: jede Verbindung bekommt den Sekundenwert."""
+    srv = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    srv.bind(str(path))
+    srv.listen(64)
+
+    def loop():
+        while True:
+            conn, _ = srv.accept()
+            with conn:
+                try:
+                    conn.sendall(f"{seconds}\n".encode())
+                except OSError:
+                    pass
+
+    threading.Thread(target=loop, daemon=True).start()
+    return srv
+
+def proc_stats(pid):
+    """(RSS in kB, offene FDs) eines Prozesses aus /proc; None, wenn beendet."""
+    try:
+        with open(f"/proc/{pid}/status", encoding="ascii") as f:
+            rss = next(int(line.split()[1]) for line in f if line.startswith("VmRSS:"))
+        return rss, len(os.listdir(f"/proc/{pid}/fd"))
+    except (OSError, StopIteration):
+        return None
+
+
+# ── Instanz ───────────────────────────────────────────
+class Instance:
+    def __init__(self, idx, workdir, base, pause_path, modules, args):
+        self.name = f"user{idx}"
+        self.home = workdir / self.name
+        self.home.mkdir(parents=True)
+        (self.home / "modules.txt").write_text("\n".join(modules) + "\n", encoding="utf-8")
+        self.api_port = free_port()
+        self.env = dict(os.environ,
+                        PYTHONPATH=str(SOURCE),
+                        NAKBOT_CIS_BASE=base,
+                        NAKBOT_USERNAME=self.name,
+                        NAKBOT_PASSWORD="pw",
+                        NAKBOT_HOME=str(self.home),
+                        NAKBOT_API_PORT=str(self.api_port),
+                        NAKBOT_NOTIFY="0",
+                        NAKBOT_PDF_WORKERS=str(args.pdf_workers),
+                        PAUSE_SOCKET=str(pause_path))
+        self.log_path = self.home / "bot.log"
+        self.proc = None
+        self.samples = []          # (t, rss_kb, fds)
+        self.detections = []       # (ts, module, grade)
+        self.exit_code = None
+
+    def start(self):
+        log = open(self.log_path, "wb")
+        self.proc = subprocess.Popen([sys.executable, "-m", "nakbot"], cwd=str(self.home),
+                                     env=self.env, stdout=log, stderr=subprocess.STDOUT)
+        log.close()
+        threading.Thread(target=self.watch_history, daemon=True).start()
+
+    def watch_history(self):
+        """Long-Polling auf /history: jede gemeldete Änderung mit Zeitstempel merken."""
+        since = 0
+        while self.proc.poll() is None:
+            url = f"http://127.0.0.1:{self.api_port}/history?since={since}&wait=30"
+            try:
+                with urllib.request.urlopen(url, timeout=40) as r:
+                    data = json.load(r)
+            except OSError:
+                time.sleep(1)
+                continue
+            for change in data["changes"]:
+                self.detections.append((change["ts"], change["module"], change["new"]))
+            since = data["seq"]
+
+    def sample(self, t):
+        stats = proc_stats(self.proc.pid)
+        if stats:
+            self.samples.append((t, *stats))
+
+    def stop(self):
+        if self.proc.poll() is None:
+            self.proc.terminate()
+            try:
+                self.proc.wait(10)
+            except subprocess.TimeoutExpired:
+                self.proc.kill()
+                self.proc.wait()
+        else:
+            self.exit_code = self.proc.returncode
+
+
+# ── Auswertung ────────────────────────────────────────
+def evaluate(inst, sim, injections, t0, t_end, args):
+    minutes = max(1e-9, (t_end - t0) / 60)
+    reqs = sorted(ts for ts, user, _, _ in sim.requests if user == inst.name)
+    peak, lo = 0, 0
+    for hi, ts in enumerate(reqs):
+        while reqs[lo] < ts - 60:
+            lo += 1
+        peak = max(peak, hi - lo + 1)
+
+    warm = [s for s in inst.samples if s[0] >= t0 + args.warmup] or inst.samples
+    rss_growth = (warm[-1][1] - warm[0][1]) / 1024 if warm else 0.0
+    fd_growth = warm[-1][2] - warm[0][2] if warm else 0
+
+    latencies, missed = [], 0
+    for ts, module, grade in injections:
+        hit = next((d for d in inst.detections if d[1] == module and d[2] == grade and d[0] >= ts), None)
+        if hit:
+            latencies.append(hit[0] - ts)
+        elif ts < t_end - args.max_latency:
+            missed += 1
+    injected = {(m, g) for _, m, g in injections}
+    wrong = sum(1 for _, m, g in inst.detections if (m, g) not in injected)
+
+    relogins = max(0, sim.logins.get(inst.name, 0) - 1)
+    return {
+        "instance": inst.name,
+        "requests": len(reqs),
+        "rpm": round(len(reqs) / minutes, 1),
+        "rpm_peak": peak,
+        "relogins": relogins,
+        "relogins_per_h": round(relogins * 60 / minutes, 1),
+        "rss_mb": round(warm[-1][1] / 1024, 1) if warm else None,
+        "rss_growth_mb": round(rss_growth, 1),
+        "fd_growth": fd_growth,
+        "latency_avg_s": round(sum(latencies) / len(latencies), 1) if latencies else None,
+        "latency_max_s": round(max(latencies), 1) if latencies else None,
+        "detected": len(latencies),
+        "missed": missed,
+        "wrong": wrong,
+        "exit_code": inst.exit_code,
+    }
+
+def violations(row, args):
+    out = []
+    if row["exit_code"] is not None:
+        out.append(f"vorzeitig beendet (Code {row['exit_code']})")
+    if row["rpm_peak"] > args.max_rpm:
+        out.append(f"{row['rpm_peak']} Requests/min > {args.max_rpm}")
+    if row["relogins_per_h"] > args.max_relogins_per_hour:
+        out.append(f"{row['relogins_per_h']} Re-Logins/h > {args.max_relogins_per_hour}")
+    if row["rss_growth_mb"] > args.max_rss_growth_mb:
+        out.append(f"RSS +{row['rss_growth_mb']} MB > {args.max_rss_growth_mb}")
+    if row["fd_growth"] > args.max_fd_growth:
+        out.append(f"FDs +{row['fd_growth']} > {args.max_fd_growth}")
+    if row["latency_max_s"] is not None and row["latency_max_s"] > args.max_latency:
+        out.append(f"Erkennung nach {row['latency_max_s']}s > {args.max_latency}s")
+    if row["missed"]:
+        out.append(f"{row['missed']} Änderung(en) nicht erkannt")
+    if row["wrong"]:
+        out.append(f"{row['wrong']} falsche Note(n) gemeldet")
+    return out
+
+
+# ── Main ──────────────────────────────────────────────
+def parse_args(argv=None):
+    p = argparse.ArgumentParser(description="Soak-/Fehlertest des Bots gegen einen lokalen CIS-Simulator",
+                                epilog="Fehlerarten: " + "; ".join(f"{k}: {v}" for k, v in FAULT_KINDS.items()))
+    p.add_argument("--duration", type=float, default=600, help="Laufzeit in Sekunden")
+    p.add_argument("--instances", type=int, default=1)
+    p.add_argument("--modules", type=int, default=5, help="Anzahl Module je Konto")
+    p.add_argument("--pause", type=int, default=5, help="Pause des Bots zwischen zwei Checks")
+    p.add_argument("--change-every", type=float, default=120, help="alle n Sekunden eine Note ändern")
+    p.add_argument("--warmup", type=float, default=30, help="vorher keine Änderungen, RSS/FD-Basis danach")
+    p.add_argument("--faults", default="", help="z. B. 'slow@60+30:3,5xx@120+20:0.5,expire@300,layout@400'")
+    p.add_argument("--session-ttl", type=float, default=1800, help="Session-Lebensdauer im Simulator")
+    p.add_argument("--pdf-workers", type=int, default=1)
+    p.add_argument("--seed", type=int, default=None)
+    p.add_argument("--sample-every", type=float, default=10)
+    p.add_argument("--max-rpm", type=float, default=60)
+    p.add_argument("--max-relogins-per-hour", type=float, default=12)
+    p.add_argument("--max-rss-growth-mb", type=float, default=50)
+    p.add_argument("--max-fd-growth", type=int, default=5)
+    p.add_argument("--max-latency", type=float, default=None, help="Standard: 2×Pause + 60s")
+    p.add_argument("--report", default=None, help="JSON-Bericht hierhin schreiben")
+    p.add_argument("--keep", action="store_true", help="Arbeitsordner (Logs, Dumps) behalten")
+    args = p.parse_args(argv)
+    if args.max_latency is None:
+        args.max_latency = 2 * args.pause + 60
+    return args
+
+def main(argv=None):
+    args = parse_args(argv)
+    rng = random.Random(args.seed)
+    modules = [f"Modul {chr(65 + i // 26)}{chr(65 + i % 26)}" for i in range(args.modules)]
+    sim = CisSimulator({m: "#" for m in modules}, session_ttl=args.session_ttl,
+                       faults=parse_faults(args.faults), seed=args.seed)
+    base = sim.start()
+
+    workdir = pathlib.Path(tempfile.mkdtemp(prefix="nakbot_soak_"))
+    pause_path = workdir / "pause.sock"
+    serve_pause(pause_path, args.pause)
+    instances = [Instance(i, workdir, base, pause_path, modules, args) for i in range(args.instances)]
+    print(f"Simulator {base}, {len(instances)} Instanz(en), {args.duration:.0f}s, Fehler: {sim.faults or '-'}")
+    print(f"Arbeitsordner: {workdir}")
+
+    t0 = time.time()
+    for inst in instances:
+        inst.start()
+
+    injections = []
+    next_change = t0 + args.warmup
+    next_sample = t0
+    try:
+        while time.time() < t0 + args.duration:
+            now = time.time()
+            sim.active_faults()  # einmalige Fehler auch ohne Anfragen pünktlich auslösen
+            if now >= next_sample:
+                for inst in instances:
+                    inst.sample(now)
+                next_sample = now + args.sample_every
+            if args.change_every and now >= next_change:
+                module = rng.choice(modules)
+                grade = rng.choice([g for g in GRADES if g != sim.grades[module]])
+                sim.set_grade(module, grade)
+                injections.append((time.time(), module, grade))
+                print(f"[{now - t0:6.0f}s] Note geändert: {module} → {grade}")
+                next_change = now + args.change_every
+            if all(inst.proc.poll() is not None for inst in instances):
+                print("Alle Instanzen beendet – breche ab.")
+                break
+            time.sleep(0.5)
+    except KeyboardInterrupt:
+        print("Abgebrochen – werte bisherigen Lauf aus.")
+    t_end = time.time()
+    for inst in instances:
+        inst.stop()
+    sim.stop()
+
+    rows = [evaluate(inst, sim, injections, t0, t_end, args) for inst in instances]
+    failed = False
+    for row in rows:
+        problems = violations(row, args)
+        failed |= bool(problems)
+        print(f"{row['instance']}: {row['rpm']} req/min (Spitze {row['rpm_peak']}), "
+              f"Re-Logins {row['relogins']}, RSS {row['rss_mb']} MB (+{row['rss_growth_mb']}), "
+              f"FDs +{row['fd_growth']}, Erkennung Ø {row['latency_avg_s']}s / max {row['latency_max_s']}s, "
+              f"{row['detected']} erkannt, {row['missed']} verpasst, {row['wrong']} falsch"
+              + (" – FAIL: " + "; ".join(problems) if problems else " – OK"))
+
+    report = {"duration_s": round(t_end - t0, 1), "faults": [repr(f) for f in sim.faults],
+              "injections": injections, "failed_logins": sim.failed_logins,
+              "instances": rows, "passed": not failed, "workdir": str(workdir)}
+    if args.report:
+        pathlib.Path(args.report).write_text(json.dumps(report, ensure_ascii=False, indent=1), encoding="utf-8")
+    if not args.keep and not failed:
+        shutil.rmtree(workdir, ignore_errors=True)
+    print("Ergebnis:", "BESTANDEN" if not failed else f"NICHT BESTANDEN (Logs: {workdir})")
+    return 0 if not failed else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
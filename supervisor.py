@@ -0,0 +1,111 @@
+import os
+import time
+import atexit
+import shutil
+import tempfile
+import collections
+
+# ── Exit-Codes des Bots (siehe nakbot/__main__.py) ───
+EXIT_OK = 0
+EXIT_RESTART = 75   # Bot bittet um geordneten Neustart (z. B. Speicher-Limit)
+EXIT_CONFIG = 78    # Konfigurationsfehler (modules.txt leer, Credentials fehlen)
+
+# ── Supervisor: Neustart-Politik für Terminal- und GUI-Runner ───
+class Supervisor:
+    """
+    Entscheidet, ob und wann der Bot nach einem Exit neu gestartet wird.
+
+    - sauberer Exit (0): kein automatischer Neustart, erst wieder bei Codeänderung
+    - Neustart-Wunsch (75): sofort, ohne Backoff
+    - Konfigurationsfehler (78): erst nach max_delay – ein Neustart ändert nichts
+    - Absturz / hängender Bot: exponentieller Backoff ab base_delay,
+      zurückgesetzt, sobald der Bot stable_after Sekunden durchgehalten hat
+
+    Lebendigkeit: der Bot aktualisiert regelmäßig die Datei aus NAKBOT_HEARTBEAT.
+    Ist sie älter als heartbeat_timeout, gilt der Bot als hängend.
+    """
+
+    def __init__(self, log, base_delay=3, max_delay=300, stable_after=120,
+                 heartbeat_timeout=None, rate_window=600, rate_warn=10):
+        self.log = log
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.stable_after = stable_after
+        self.heartbeat_timeout = heartbeat_timeout or int(os.getenv("NAKBOT_HEARTBEAT_TIMEOUT", "300"))
+        self.rate_window = rate_window
+        self.rate_warn = rate_warn
+        # eigenes Verzeichnis (0700): kein anderer Benutzer kann den Pfad vorher anlegen
+        self.heartbeat_dir = tempfile.mkdtemp(prefix="nakbot_heartbeat_")
+        self.heartbeat_path = os.path.join(self.heartbeat_dir, "heartbeat.txt")
+        atexit.register(shutil.rmtree, self.heartbeat_dir, ignore_errors=True)
+        self.failures = 0
+        self.started_at = None
+        self.restarts = collections.deque()
+
+    def env(self, base=None):
+        env = dict(os.environ if base is None else base)
+        env["NAKBOT_HEARTBEAT"] = self.heartbeat_path
+        return env
+
+    def started(self):
+        self.cleanup()
+        self.started_at = time.time()
+        self.restarts.append(self.started_at)
+        while self.restarts and self.restarts[0] < self.started_at - self.rate_window:
+            self.restarts.popleft()
+        if len(self.restarts) > self.rate_warn:
+            self.log(f"⚠️ {len(self.restarts)} Starts in {self.rate_window // 60} min – Bot startet auffällig oft neu")
+
+    def reset(self):
+        """Nach Codeänderung: alte Fehlerserie zählt nicht mehr."""
+        self.failures = 0
+
+    def restart_rate(self):
+        """Starts pro Stunde im Beobachtungsfenster."""
+        return len(self.restarts) * 3600 / self.rate_window
+
+    def heartbeat_age(self):
+        try:
+            return time.time() - os.stat(self.heartbeat_path).st_mtime
+        except FileNotFoundError:
+            return time.time() - self.started_at if self.started_at else 0
+
+    def is_hung(self):
+        if self.started_at is None or time.time() - self.started_at < self.heartbeat_timeout:
+            return False
+        return self.heartbeat_age() > self.heartbeat_timeout
+
+    def exited(self, code):
+        """
+        Exit verbuchen. Gibt die Wartezeit bis zum Neustart in Sekunden zurück,
+        oder None, wenn nicht automatisch neu gestartet werden soll.
+        code=None bedeutet: vom Supervisor wegen fehlendem Heartbeat beendet.
+        """
+        uptime = time.time() - self.started_at if self.started_at else 0
+        self.started_at = None
+        if uptime >= self.stable_after:
+            self.failures = 0
+
+        if code == EXIT_OK:
+            self.log("Bot sauber beendet – kein automatischer Neustart.")
+            return None
+        if code == EXIT_RESTART:
+            self.log("Bot fordert Neustart an – starte sofort neu …")
+            return 0
+        if code == EXIT_CONFIG:
+            self.log(f"Bot beendet wegen Konfigurationsfehler – nächster Versuch in {self.max_delay}s "
+                     "(oder sofort nach Änderung an modules.txt/__main__.py).")
+            return self.max_delay
+
+        self.failures += 1
+        delay = min(self.max_delay, self.base_delay * 2 ** (self.failures - 1))
+        reason = "hängt (kein Heartbeat)" if code is None else f"abgestürzt mit Code {code}"
+        self.log(f"Bot {reason} nach {uptime:.0f}s – Neustart in {delay}s "
+                 f"(Fehler in Folge: {self.failures}, Starts/h: {self.restart_rate():.0f})")
+        return delay
+
+    def cleanup(self):
+        try:
+            os.remove(self.heartbeat_path)
+        except FileNotFoundError:
+            pass